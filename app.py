@@ -1,23 +1,33 @@
 import logging
 import os
 import secrets
-import time
-from threading import Lock
-from uuid import uuid4
 
 from flask import Flask, Response, g, jsonify, request
 from flask_smorest import Api
 
 from flask_migrate import Migrate
-from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from resources.item import blp as ItemBlueprint
 from resources.store import blp as StoreBlueprint
 from resources.tag import blp as TagBlueprint
 from resources.user import blp as UserBlueprint
+from resources.export import blp as ExportBlueprint
 
 from models import StoreModel
-from blocklist import BLOCKLIST
+from blocklist import init_revocation_cache, is_token_revoked
 from db import db
+from db_pool import configure_pool, instrument_engine
+from replicas import init_replicas, replica_status
+from query_stats import (
+    check_repeated_queries,
+    current_query_stats,
+    instrument_queries,
+    start_query_stats,
+)
+from cache import init_entity_cache
+from compression import init_compression
+from commands import register_commands
+from passwords import init_password_hasher
+from warmup import init_warmup, warm_up, warmup_state
 
 from dotenv import load_dotenv
 from flask_jwt_extended import JWTManager, get_jwt_identity
@@ -25,23 +35,16 @@ from flask.signals import got_request_exception
 from sqlalchemy import text
 
 from logging_setup import setup_logging
-from metrics import (
-    HTTP_REQUEST_DURATION_SECONDS,
-    HTTP_REQUESTS_ERRORS_TOTAL,
-    HTTP_REQUESTS_IN_FLIGHT,
-    HTTP_REQUESTS_TOTAL,
-    configure_service_metrics,
-    service_name,
+from http_metrics import (
+    UNMATCHED_ROUTE,
+    bind_route,
+    current_request_record,
+    init_http_metrics,
 )
+from metrics import configure_service_metrics, render_metrics
 
 load_dotenv()  
 
-db_user = os.getenv("DB_USER")
-db_password = os.getenv("DB_PASSWORD")
-db_name = os.getenv("DB_NAME")
-db_host = os.getenv("DB_HOST")
-db_port = os.getenv("DB_PORT")
-
 secret_key = os.getenv("SECRET_KEY")
 
 
@@ -50,16 +53,10 @@ def create_app(db_url=None):
     setup_logging()
     configure_service_metrics()
     app = Flask(__name__)
-    # app.config['SQLALCHEMY_DATABASE_URI'] = (
-    #     f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
-    # )
-
-    app.config['SQLALCHEMY_DATABASE_URI'] = (
-            f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
-            f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
-        )
-
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config["SQLALCHEMY_DATABASE_URI"] = db_url or (
+        f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
+        f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
+    )
 
     app.config["PROPAGATE_EXCEPTIONS"] = True
     app.config["API_TITLE"] = "Stores REST API"
@@ -68,105 +65,56 @@ def create_app(db_url=None):
     app.config["OPENAPI_URL_PREFIX"] = "/"
     app.config["OPENAPI_SWAGGER_UI_PATH"] = "/swagger-ui"
     app.config["OPENAPI_SWAGGER_UI_URL"] = "https://cdn.jsdelivr.net/npm/swagger-ui-dist/"
-    app.config["SQLALCHEMY_DATABASE_URI"] = (
-        f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
-    )    
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["PAGINATION_DEFAULT_LIMIT"] = int(os.getenv("PAGINATION_DEFAULT_LIMIT", "50"))
+    app.config["PAGINATION_MAX_LIMIT"] = int(os.getenv("PAGINATION_MAX_LIMIT", "500"))
+    app.config["EXPORT_CHUNK_SIZE"] = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+    app.config["BULK_CHUNK_SIZE"] = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+    app.config["STORE_DELETE_CHUNK_SIZE"] = int(os.getenv("STORE_DELETE_CHUNK_SIZE", "1000"))
+    app.config["STORE_DELETE_ASYNC_THRESHOLD"] = int(
+        os.getenv("STORE_DELETE_ASYNC_THRESHOLD", "10000")
+    )
+    app.config["STORE_DELETE_JOB_STALE_SECONDS"] = int(
+        os.getenv("STORE_DELETE_JOB_STALE_SECONDS", "300")
+    )
+    app.config["QUERY_REPEAT_THRESHOLD"] = int(os.getenv("QUERY_REPEAT_THRESHOLD", "0"))
+    app.config["QUERY_REPEAT_ACTION"] = os.getenv("QUERY_REPEAT_ACTION", "warn").lower()
+    configure_pool(app)
+    init_replicas(app)
     db.init_app(app)
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            instrument_engine(engine, bind_key or "primary")
+            instrument_queries(engine)
+    init_entity_cache(app)
+    app.config["JWT_REVOCATION_SYNC_SECONDS"] = float(
+        os.getenv("JWT_REVOCATION_SYNC_SECONDS", "5")
+    )
+    init_revocation_cache(app)
+    init_password_hasher(app)
     app.config["JWT_SECRET_KEY"] = str(secrets.SystemRandom().getrandbits(128))
-    tables_init_lock = Lock()
-    app.extensions["tables_initialized"] = False
+    init_warmup(app)
+    init_http_metrics(app)
+    init_compression(app)
 
     @app.before_request
     def set_request_context():
-        g.request_id = request.headers.get("X-Request-ID") or str(uuid4())
-        g.request_start = time.perf_counter()
-        route_template = request.url_rule.rule if request.url_rule else "NOT_FOUND"
-        g.metrics_route = route_template
-        g.metrics_method = request.method
-        HTTP_REQUESTS_IN_FLIGHT.labels(
-            service=service_name(),
-            method=request.method,
-            route=route_template,
-        ).inc()
-
-    @app.before_request
-    def create_tables_once():
-        if request.endpoint in {"healthz", "readyz", "metrics"}:
-            return
-        if request.url_rule is None:
-            return
-        if app.extensions.get("tables_initialized"):
-            return
-
-        with tables_init_lock:
-            if app.extensions.get("tables_initialized"):
-                return
-            db.create_all()
-            app.extensions["tables_initialized"] = True
+        record = current_request_record()
+        g.request_id = record.request_id
+        start_query_stats()
+        record.query_stats = current_query_stats()
+        bind_route(record)
 
     @app.after_request
-    def log_request(response):
-        route_template = getattr(
-            g,
-            "metrics_route",
-            request.url_rule.rule if request.url_rule else "NOT_FOUND",
-        )
-        method = getattr(g, "metrics_method", request.method)
-        status_code = str(response.status_code)
-
-        HTTP_REQUESTS_IN_FLIGHT.labels(
-            service=service_name(),
-            method=method,
-            route=route_template,
-        ).dec()
-        HTTP_REQUESTS_TOTAL.labels(
-            service=service_name(),
-            method=method,
-            route=route_template,
-            status_code=status_code,
-        ).inc()
-        if status_code.startswith(("4", "5")):
-            HTTP_REQUESTS_ERRORS_TOTAL.labels(
-                service=service_name(),
-                method=method,
-                route=route_template,
-                status_code=status_code,
-            ).inc()
-
-        duration_ms = None
-        duration_seconds = None
-        if hasattr(g, "request_start"):
-            duration_seconds = max(time.perf_counter() - g.request_start, 0)
-            duration_ms = round(duration_seconds * 1000, 2)
-            HTTP_REQUEST_DURATION_SECONDS.labels(
-                service=service_name(),
-                method=method,
-                route=route_template,
-            ).observe(duration_seconds)
-
+    def finish_request(response):
+        record = current_request_record()
         try:
-            user_id = get_jwt_identity()
+            record.user_id = get_jwt_identity()
         except Exception:
-            user_id = None
-
-        logging.getLogger("app.request").info(
-            "HTTP request completed",
-            extra={
-                "event": "http_request",
-                "request_id": getattr(g, "request_id", None),
-                "method": request.method,
-                "route": request.url_rule.rule if request.url_rule else None,
-                "path": request.path,
-                "status": response.status_code,
-                "duration_ms": duration_ms,
-                "remote_addr": request.remote_addr,
-                "user_id": user_id,
-            },
-        )
+            record.user_id = None
 
-        if hasattr(g, "request_id"):
-            response.headers["X-Request-ID"] = g.request_id
+        response.headers["X-Request-ID"] = record.request_id
+        check_repeated_queries(record.query_stats, record.route or UNMATCHED_ROUTE)
         return response
 
     def log_exception(sender, exception, **extra):
@@ -197,22 +145,32 @@ def create_app(db_url=None):
 
     @app.get("/readyz")
     def readyz():
+        state = warmup_state(app)
+        if not state.ready and not warm_up(app, blocking=False):
+            return jsonify({"status": "not_ready", "reason": state.error or "warming_up"}), 503
         try:
             db.session.execute(text("SELECT 1"))
-            return jsonify({"status": "ready"}), 200
+            payload = {"status": "ready"}
+            replicas = replica_status(app)
+            if replicas:
+                # Informational: reads fall back to the primary without them.
+                payload["replicas"] = replicas
+            return jsonify(payload), 200
         except Exception:
             db.session.rollback()
             return jsonify({"status": "not_ready"}), 503
 
     @app.get("/metrics")
     def metrics():
-        return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
+        body, content_type = render_metrics(request.headers.get("Accept"))
+        return Response(body, content_type=content_type)
 
     def create_defaults():
         pass
 
     api = Api(app)
     migrate = Migrate(app, db)
+    register_commands(app)
 
     jwt = JWTManager(app)
     @jwt.additional_claims_loader
@@ -244,7 +202,7 @@ def create_app(db_url=None):
 
     @jwt.token_in_blocklist_loader
     def check_if_token_in_blocklist(jwt_header, jwt_payload):
-        return jwt_payload["jti"] in BLOCKLIST
+        return is_token_revoked(jwt_payload)
     
     @jwt.revoked_token_loader
     def revoked_token_callback(jwt_header, jwt_payload):
@@ -269,5 +227,7 @@ def create_app(db_url=None):
     api.register_blueprint(StoreBlueprint)
     api.register_blueprint(TagBlueprint)
     api.register_blueprint(UserBlueprint)
+    api.register_blueprint(ExportBlueprint)
 
+    warm_up(app)
     return app
@@ -0,0 +1,3 @@
+from asgi_app import create_asgi_app
+
+app = create_asgi_app()
@@ -0,0 +1,377 @@
+"""
+    ASGI serving mode.
+
+    ``create_asgi_app()`` wraps the regular Flask app. The catalog reads
+    (item, store and tag lists and lookups, store search, counts and store
+    tags) run as coroutines on an async SQLAlchemy engine (asyncpg, or
+    aiosqlite for SQLite URLs), so a request waiting on the database holds no
+    thread. Everything else, including writes, users/JWT, exports, /readyz
+    and /metrics, is handed to the Flask app on a bounded thread pool,
+    unchanged.
+
+    The async views run inside a Flask request context built from the ASGI
+    scope and go through the app's own ``before_request``/``after_request``
+    hooks and error handlers. Request IDs, metrics, the request log line,
+    query stats, compression and error bodies therefore behave exactly as
+    they do under WSGI.
+"""
+import io
+import os
+import sys
+
+from a2wsgi import WSGIMiddleware
+from flask import abort, request
+from flask_smorest import abort as api_abort
+from flask_smorest.arguments import ArgumentsMixin
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from werkzeug.exceptions import HTTPException
+
+from app import create_app
+from cache import async_cached_response
+from db_pool import InstrumentedAsyncQueuePool, instrument_engine, pool_options
+from etags import (
+    is_not_modified,
+    item_etag,
+    list_etag,
+    list_fingerprint_statement,
+    list_tables,
+    not_modified_response,
+    store_etag,
+    tag_etag,
+)
+from fieldsets import select_schema
+from http_metrics import ENVIRON_KEY, RequestRecord
+from loading import eager_load_options
+from metrics import STORE_SEARCH_TOTAL, service_name
+from models import ItemModel, StoreModel, TagModel
+from pagination import page_bounds, page_headers, page_limit
+from query_stats import instrument_queries
+from resources.store import search_page, search_stores
+from schemas import (
+    FieldSelectionArgsSchema,
+    ItemSchema,
+    PaginationArgsSchema,
+    StoreSchema,
+    StoreSearchArgsSchema,
+    TagSchema,
+)
+from serialization import json_response
+
+
+DEFAULT_WSGI_THREADS = 10
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def async_database_url(url):
+    """The async-driver equivalent of a sync SQLAlchemy URL."""
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
+
+
+def _query_args(schema_class):
+    # Same parser, locations and unknown-field handling as ``@blp.arguments``.
+    return ArgumentsMixin.ARGUMENTS_PARSER.parse(schema_class(), location="query")
+
+
+def _int_or_404(value):
+    try:
+        return int(value)
+    except ValueError:
+        abort(404)
+
+
+def _schema_select(model, schema):
+    return select(model).options(*eager_load_options(model, schema))
+
+
+async def _get_or_404(session, model, schema, entity_id):
+    entity = await session.get(
+        model, _int_or_404(entity_id), options=eager_load_options(model, schema)
+    )
+    if entity is None:
+        abort(404)
+    return entity
+
+
+async def _paginate(session, statement, key_column, pagination_args):
+    limit, after, metadata = page_bounds(pagination_args)
+    if pagination_args.get("include_total"):
+        metadata["total"] = await session.scalar(
+            select(func.count()).select_from(statement.order_by(None).subquery())
+        )
+
+    if after is not None:
+        statement = statement.where(key_column > after)
+
+    rows = (await session.scalars(statement.order_by(key_column).limit(limit + 1))).all()
+    return page_headers(rows, limit, key_column, metadata)
+
+
+async def _list_response(session, kind, model, schema_class):
+    pagination_args = _query_args(PaginationArgsSchema)
+    selection_args = _query_args(FieldSelectionArgsSchema)
+    schema = select_schema(schema_class, selection_args)
+    tables = list_tables(kind, schema)
+    etag = list_etag(kind, schema, (await session.execute(list_fingerprint_statement(tables))).all())
+    if is_not_modified(etag):
+        return not_modified_response(etag)
+    rows, headers = await _paginate(
+        session, _schema_select(model, schema), model.id, pagination_args
+    )
+    headers["ETag"] = f'"{etag}"'
+    return json_response(schema, rows, many=True, headers=headers)
+
+
+async def item_list(session):
+    return await _list_response(session, "item", ItemModel, ItemSchema)
+
+
+async def store_list(session):
+    return await _list_response(session, "store", StoreModel, StoreSchema)
+
+
+async def tag_list(session):
+    return await _list_response(session, "tag", TagModel, TagSchema)
+
+
+async def item_detail(session, item_id):
+    return await async_cached_response(
+        "item",
+        item_id,
+        ItemSchema(),
+        lambda: _get_or_404(session, ItemModel, ItemSchema, item_id),
+        item_etag,
+    )
+
+
+async def store_detail(session, store_id):
+    return await async_cached_response(
+        "store",
+        store_id,
+        StoreSchema(),
+        lambda: _get_or_404(session, StoreModel, StoreSchema, store_id),
+        store_etag,
+    )
+
+
+async def tag_detail(session, tag_id):
+    return await async_cached_response(
+        "tag",
+        tag_id,
+        TagSchema(),
+        lambda: _get_or_404(session, TagModel, TagSchema, tag_id),
+        tag_etag,
+    )
+
+
+async def store_search(session):
+    search_args = _query_args(StoreSearchArgsSchema)
+    selection_args = _query_args(FieldSelectionArgsSchema)
+    name = search_args.get("name")
+    if not name:
+        api_abort(400, message="Provide ?name=<term>")
+    STORE_SEARCH_TOTAL.labels(service=service_name()).inc()
+
+    limit = page_limit(search_args.get("limit"))
+    offset = search_args["offset"]
+    schema = select_schema(StoreSchema, selection_args)
+    statement = search_stores(
+        _schema_select(StoreModel, schema), name, session.bind.dialect.name
+    )
+    stores = (await session.scalars(statement.offset(offset).limit(limit + 1))).all()
+    stores, headers = search_page(stores, limit, offset)
+    return json_response(schema, stores, many=True, headers=headers)
+
+
+async def store_item_count(session, store_id):
+    counts = (
+        await session.execute(
+            select(StoreModel.item_count, StoreModel.tag_count).where(
+                StoreModel.id == store_id
+            )
+        )
+    ).first()
+    item_count, tag_count = counts or (0, 0)
+    return {"store_id": store_id, "item_count": item_count, "tag_count": tag_count}
+
+
+async def tags_in_store(session, store_id):
+    selection_args = _query_args(FieldSelectionArgsSchema)
+    store_id = _int_or_404(store_id)
+    if await session.get(StoreModel, store_id) is None:
+        abort(404)
+    schema = select_schema(TagSchema, selection_args)
+    tags = (
+        await session.scalars(_schema_select(TagModel, schema).where(TagModel.store_id == store_id))
+    ).all()
+    return json_response(schema, tags, many=True)
+
+
+# Flask endpoint -> coroutine serving its GET (and HEAD).
+ASYNC_VIEWS = {
+    "Items.ItemList": item_list,
+    "Items.Item": item_detail,
+    "Stores.StoreList": store_list,
+    "Stores.Store": store_detail,
+    "Stores.StoreSearch": store_search,
+    "Stores.StoreItemCount": store_item_count,
+    "Tags.TagList": tag_list,
+    "Tags.Tag": tag_detail,
+    "Tags.TagsInStore": tags_in_store,
+}
+
+
+def _environ(scope):
+    """Minimal WSGI environ for a bodiless (GET/HEAD) ASGI request."""
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+    client = scope.get("client")
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin-1"),
+        "PATH_INFO": scope["path"].encode().decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0] if client else None,
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope["headers"]:
+        name = name.decode("latin-1")
+        if name == "content-type":
+            key = "CONTENT_TYPE"
+        elif name == "content-length":
+            key = "CONTENT_LENGTH"
+        else:
+            key = "HTTP_" + name.upper().replace("-", "_")
+        value = value.decode("latin-1")
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+class AsgiApp:
+    """ASGI callable: async catalog reads, everything else through Flask."""
+
+    def __init__(self, flask_app, async_engine, wsgi_threads=DEFAULT_WSGI_THREADS):
+        self.flask_app = flask_app
+        self.async_engine = async_engine
+        self.wsgi = WSGIMiddleware(flask_app, workers=wsgi_threads)
+        self.metrics = flask_app.extensions["http_metrics"]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+            environ = _environ(scope)
+            view = self._async_view(environ)
+            if view is not None:
+                await self._serve(view, environ, send)
+                return
+        await self.wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.async_engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _async_view(self, environ):
+        adapter = self.flask_app.url_map.bind_to_environ(environ)
+        try:
+            rule, _ = adapter.match(return_rule=True)
+        except HTTPException:
+            # 404s, 405s and redirects are Flask's to render.
+            return None
+        return ASYNC_VIEWS.get(rule.endpoint)
+
+    async def _serve(self, view, environ, send):
+        # What HttpMetricsMiddleware and Flask.wsgi_app do for a WSGI request.
+        record = RequestRecord(environ)
+        environ[ENVIRON_KEY] = record
+        flask_app = self.flask_app
+        ctx = flask_app.request_context(environ)
+        error = None
+        try:
+            ctx.push()
+            try:
+                response = await self._dispatch(view)
+            except Exception as exc:
+                error = exc
+                response = flask_app.handle_exception(exc)
+            record.status = response.status_code
+            await _send_response(send, response, environ["REQUEST_METHOD"])
+        except BaseException:
+            record.status = 500
+            raise
+        finally:
+            try:
+                ctx.pop(error)
+            finally:
+                self.metrics.finish(record)
+
+    async def _dispatch(self, view):
+        flask_app = self.flask_app
+        try:
+            rv = flask_app.preprocess_request()
+            if rv is None:
+                async with AsyncSession(self.async_engine, expire_on_commit=False) as session:
+                    rv = await view(session, **request.view_args)
+        except Exception as exc:
+            rv = flask_app.handle_user_exception(exc)
+        return flask_app.finalize_request(rv)
+
+
+async def _send_response(send, response, method):
+    try:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": [
+                    (name.lower().encode("latin-1"), value.encode("latin-1"))
+                    for name, value in response.headers.items()
+                ],
+            }
+        )
+        body = b"" if method == "HEAD" else response.get_data()
+        await send({"type": "http.response.body", "body": body})
+    finally:
+        response.close()
+
+
+def create_asgi_app(db_url=None):
+    flask_app = create_app(db_url)
+    config = flask_app.config
+    config.setdefault(
+        "ASYNC_DATABASE_URI",
+        os.getenv("ASYNC_DATABASE_URI")
+        or async_database_url(config["SQLALCHEMY_DATABASE_URI"]),
+    )
+    config.setdefault(
+        "ASGI_WSGI_THREADS", int(os.getenv("ASGI_WSGI_THREADS", DEFAULT_WSGI_THREADS))
+    )
+
+    url = config["ASYNC_DATABASE_URI"]
+    async_engine = create_async_engine(
+        url, **pool_options(flask_app, url, poolclass=InstrumentedAsyncQueuePool)
+    )
+    instrument_engine(async_engine.sync_engine, "async")
+    instrument_queries(async_engine.sync_engine)
+    return AsgiApp(flask_app, async_engine, wsgi_threads=config["ASGI_WSGI_THREADS"])
@@ -0,0 +1,80 @@
+"""
+    Micro-benchmark for ``serialization.py``.
+
+    Times ``GET /item``-shaped payloads of seeded ORM rows through the
+    marshmallow schemas and through the compiled dumpers. Byte-for-byte
+    parity is covered by ``tests/test_serialization_parity.py``.
+
+    Run from the repository root:
+
+        python -m benchmarks.serialization --items 500 --tags-per-item 3
+"""
+import argparse
+import os
+import sys
+import timeit
+
+os.environ.setdefault("WARMUP_SCHEMA_CHECK", "off")
+
+from flask import current_app  # noqa: E402
+
+from app import create_app  # noqa: E402
+from db import db  # noqa: E402
+from loading import schema_query  # noqa: E402
+from models import ItemModel, StoreModel, TagModel  # noqa: E402
+from schemas import ItemSchema  # noqa: E402
+from serialization import dump, json_response  # noqa: E402
+
+
+def seed(stores, items, tags_per_item):
+    db.session.add(StoreModel(id=0, name="Unassigned"))
+    store_rows = [StoreModel(name=f"store-{i} é漢 \"q\"") for i in range(stores)]
+    db.session.add_all(store_rows)
+    db.session.flush()
+
+    tags = [TagModel(name=f"tag-{i}\n\t", store_id=store_rows[i % stores].id) for i in range(20)]
+    db.session.add_all(tags)
+    for i in range(items):
+        store = store_rows[i % stores]
+        item = ItemModel(name=f"item-{i} ☃", price=i * 1.1 + 1e-7, store_id=store.id)
+        item.tags = [tags[(i + k) % len(tags)] for k in range(tags_per_item)]
+        db.session.add(item)
+    db.session.commit()
+
+
+def benchmark(repeat):
+    items = schema_query(ItemModel, ItemSchema).all()
+    schema = ItemSchema(many=True)
+    results = {}
+    for name, fn in (
+        ("marshmallow", lambda: current_app.json.response(schema.dump(items)).get_data()),
+        ("compiled", lambda: json_response(ItemSchema, items, many=True).get_data()),
+        ("marshmallow (dump only)", lambda: schema.dump(items)),
+        ("compiled (dump only)", lambda: dump(ItemSchema, items, many=True)),
+    ):
+        results[name] = min(timeit.repeat(fn, number=1, repeat=repeat)) * 1000
+        print(f"{name:<26} {results[name]:8.2f} ms per {len(items)} items")
+    print(
+        f"speedup: {results['marshmallow'] / results['compiled']:.1f}x end to end, "
+        f"{results['marshmallow (dump only)'] / results['compiled (dump only)']:.1f}x dump only"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--stores", type=int, default=10)
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--tags-per-item", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app("sqlite://")
+    with app.app_context():
+        db.create_all()
+        seed(args.stores, args.items, args.tags_per_item)
+        benchmark(args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
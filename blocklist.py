@@ -1,5 +1,134 @@
 """
-    blocklist of JWT tokens 
+    Revocation store for JWT tokens.
+
+    Revoked jtis live in the ``revoked_tokens`` table until the token's own
+    ``exp``, so every worker sees them and the table prunes itself. Each
+    process keeps an in-memory mirror of the unexpired jtis, refreshed
+    incrementally every few seconds, so checking a token that was never
+    revoked costs a dict lookup instead of a query.
 """
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import delete, func, select
+from sqlalchemy.exc import IntegrityError
+
+from db import db
+from models import RevokedTokenModel
+from replicas import primary_reads
+
+
+NO_EXPIRY_RETENTION = timedelta(days=365)
+SYNC_INTERVAL_SECONDS = 5
+SYNC_OVERLAP_SECONDS = 30
+PRUNE_INTERVAL_SECONDS = 300
+
+
+class RevocationCache:
+    def __init__(
+        self,
+        sync_interval=SYNC_INTERVAL_SECONDS,
+        sync_overlap=SYNC_OVERLAP_SECONDS,
+        prune_interval=PRUNE_INTERVAL_SECONDS,
+    ):
+        self.sync_interval = sync_interval
+        self.sync_overlap = timedelta(seconds=sync_overlap)
+        self.prune_interval = prune_interval
+        self._revoked = {}
+        self._watermark = None
+        self._next_sync = 0.0
+        self._next_prune = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, jti, expires_at):
+        self._revoked[jti] = expires_at.timestamp()
+
+    def contains(self, jti):
+        self._maybe_sync()
+        expires_at = self._revoked.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+    def _maybe_sync(self):
+        if time.monotonic() < self._next_sync:
+            return
+        # Only the first load has to block; afterwards a request that finds
+        # another thread already syncing keeps using the current mirror.
+        if not self._lock.acquire(blocking=self._watermark is None):
+            return
+        try:
+            if time.monotonic() >= self._next_sync:
+                # A lagging replica could hide a revocation just made.
+                with primary_reads():
+                    self._sync()
+        finally:
+            self._lock.release()
+
+    def _sync(self):
+        db_now = db.session.execute(select(func.now())).scalar_one()
+        query = select(RevokedTokenModel.jti, RevokedTokenModel.expires_at).where(
+            RevokedTokenModel.expires_at > func.now()
+        )
+        if self._watermark is not None:
+            # Re-read an overlap window so rows from transactions that
+            # committed after the previous sync are not missed.
+            query = query.where(RevokedTokenModel.revoked_at >= self._watermark)
+
+        for jti, expires_at in db.session.execute(query):
+            self.add(jti, _as_utc(expires_at))
+
+        now = time.time()
+        for jti, expires_at in list(self._revoked.items()):
+            if expires_at <= now:
+                self._revoked.pop(jti, None)
+        self._watermark = _as_utc(db_now) - self.sync_overlap
+
+        if time.monotonic() >= self._next_prune:
+            prune_revoked_tokens()
+            self._next_prune = time.monotonic() + self.prune_interval
+        db.session.commit()
+        self._next_sync = time.monotonic() + self.sync_interval
+
+
+def _as_utc(value):
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def init_revocation_cache(app):
+    app.extensions["token_revocations"] = RevocationCache(
+        sync_interval=app.config.get("JWT_REVOCATION_SYNC_SECONDS", SYNC_INTERVAL_SECONDS),
+        sync_overlap=app.config.get("JWT_REVOCATION_SYNC_OVERLAP_SECONDS", SYNC_OVERLAP_SECONDS),
+        prune_interval=app.config.get("JWT_REVOCATION_PRUNE_SECONDS", PRUNE_INTERVAL_SECONDS),
+    )
+
+
+def revoke_token(jwt_payload):
+    """Revoke a token until its own expiry."""
+    jti = jwt_payload["jti"]
+    if "exp" in jwt_payload:
+        expires_at = datetime.fromtimestamp(jwt_payload["exp"], tz=timezone.utc)
+    else:
+        expires_at = datetime.now(timezone.utc) + NO_EXPIRY_RETENTION
+    try:
+        db.session.add(RevokedTokenModel(jti=jti, expires_at=expires_at))
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+    current_app.extensions["token_revocations"].add(jti, expires_at)
+
+
+def is_token_revoked(jwt_payload):
+    return current_app.extensions["token_revocations"].contains(jwt_payload["jti"])
+
 
-BLOCKLIST = set()
\ No newline at end of file
+def prune_revoked_tokens():
+    """Drop revocations whose tokens have expired anyway; returns the count."""
+    result = db.session.execute(
+        delete(RevokedTokenModel).where(RevokedTokenModel.expires_at <= func.now())
+    )
+    return result.rowcount
@@ -0,0 +1,247 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Response, current_app
+
+from etags import is_not_modified, not_modified_response
+from replicas import load_or_retry_on_primary, primary_reads
+from serialization import dump
+from metrics import (
+    CACHE_EVICTIONS_TOTAL,
+    CACHE_HITS_TOTAL,
+    CACHE_INVALIDATIONS_TOTAL,
+    CACHE_MISSES_TOTAL,
+    service_name,
+)
+
+
+DEFAULT_TTL_SECONDS = 60
+DEFAULT_MAX_ENTRIES = 10000
+
+
+class LRUCacheBackend:
+    """In-process LRU cache with a per-entry TTL."""
+
+    name = "memory"
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._evicted()
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evicted()
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            keys = [key for key in self._entries if key.startswith(prefix)]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def _evicted(self):
+        CACHE_EVICTIONS_TOTAL.labels(service=service_name(), backend=self.name).inc()
+
+
+class RedisCacheBackend:
+    """Shared cache on a Redis-compatible client; expiry is left to the server."""
+
+    name = "redis"
+
+    def __init__(self, client, ttl=DEFAULT_TTL_SECONDS, prefix="store-api:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, value, ex=self.ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*(self.prefix + key for key in keys))
+
+    def delete_prefix(self, prefix, batch_size=1000):
+        deleted = 0
+        batch = []
+        for key in self.client.scan_iter(match=f"{self.prefix}{prefix}*", count=batch_size):
+            batch.append(key)
+            if len(batch) >= batch_size:
+                deleted += self.client.delete(*batch)
+                batch = []
+        if batch:
+            deleted += self.client.delete(*batch)
+        return deleted
+
+
+def create_cache_backend(backend, ttl, max_entries, redis_url=None):
+    if backend == "memory":
+        return LRUCacheBackend(max_entries=max_entries, ttl=ttl)
+    if backend == "redis":
+        import redis
+
+        return RedisCacheBackend(redis.Redis.from_url(redis_url), ttl=ttl)
+    return None
+
+
+def init_entity_cache(app):
+    app.config.setdefault("CACHE_BACKEND", os.getenv("CACHE_BACKEND", "none").lower())
+    app.config.setdefault(
+        "CACHE_TTL_SECONDS", int(os.getenv("CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+    )
+    app.config.setdefault(
+        "CACHE_MAX_ENTRIES", int(os.getenv("CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+    )
+    app.config.setdefault("CACHE_REDIS_URL", os.getenv("CACHE_REDIS_URL"))
+
+    app.extensions["entity_cache"] = create_cache_backend(
+        app.config["CACHE_BACKEND"],
+        ttl=app.config["CACHE_TTL_SECONDS"],
+        max_entries=app.config["CACHE_MAX_ENTRIES"],
+        redis_url=app.config["CACHE_REDIS_URL"],
+    )
+
+
+def entity_key(kind, entity_id):
+    try:
+        entity_id = int(entity_id)
+    except (TypeError, ValueError):
+        pass
+    return f"{kind}:{entity_id}"
+
+
+def cached_response(kind, entity_id, schema, load, etag):
+    """Serve one entity as JSON with an ETag, honouring ``If-None-Match``.
+
+    The cache holds the ETag together with the exact response body, so a hit
+    skips the query and the schema dump. On a miss the entity is loaded (from
+    the primary, when a cache is configured) and its version-based ETag
+    checked before anything is serialized.
+    """
+    backend = current_app.extensions.get("entity_cache")
+    key = entity_key(kind, entity_id)
+
+    entry = backend.get(key) if backend is not None else None
+    if entry is not None:
+        CACHE_HITS_TOTAL.labels(service=service_name(), entity=kind).inc()
+        tag, body = split_entry(entry)
+    else:
+        if backend is not None:
+            CACHE_MISSES_TOTAL.labels(service=service_name(), entity=kind).inc()
+            # A lagging replica could refill the entry a write just
+            # invalidated with the old version; fill the cache from the primary.
+            with primary_reads():
+                obj = load()
+        else:
+            obj = load_or_retry_on_primary(load)
+        tag = etag(obj)
+        if is_not_modified(tag):
+            return not_modified_response(tag)
+        body = current_app.json.response(dump(schema, obj)).get_data()
+        if backend is not None:
+            backend.set(key, make_entry(tag, body))
+
+    return entity_response(tag, body)
+
+
+async def async_cached_response(kind, entity_id, schema, load, etag):
+    """``cached_response`` for the ASGI views: ``load`` is a coroutine function,
+    and backend calls other than the in-process LRU run in a worker thread."""
+    backend = current_app.extensions.get("entity_cache")
+    key = entity_key(kind, entity_id)
+
+    entry = await _backend_call(backend.get, key) if backend is not None else None
+    if entry is not None:
+        CACHE_HITS_TOTAL.labels(service=service_name(), entity=kind).inc()
+        tag, body = split_entry(entry)
+    else:
+        if backend is not None:
+            CACHE_MISSES_TOTAL.labels(service=service_name(), entity=kind).inc()
+        obj = await load()
+        tag = etag(obj)
+        if is_not_modified(tag):
+            return not_modified_response(tag)
+        body = current_app.json.response(dump(schema, obj)).get_data()
+        if backend is not None:
+            await _backend_call(backend.set, key, make_entry(tag, body))
+
+    return entity_response(tag, body)
+
+
+async def _backend_call(method, *args):
+    if isinstance(method.__self__, LRUCacheBackend):
+        return method(*args)
+    return await asyncio.to_thread(method, *args)
+
+
+def make_entry(tag, body):
+    return tag.encode() + b"\n" + body
+
+
+def split_entry(entry):
+    tag, body = entry.split(b"\n", 1)
+    return tag.decode(), body
+
+
+def entity_response(tag, body):
+    """Response for a serialized entity, or ``304`` if the client has ``tag``."""
+    if is_not_modified(tag):
+        return not_modified_response(tag)
+
+    response = Response(body, mimetype=current_app.json.mimetype)
+    response.set_etag(tag)
+    return response
+
+
+def invalidate(*keys):
+    """Drop cached entities; call after the write has been committed."""
+    backend = current_app.extensions.get("entity_cache")
+    keys = set(keys)
+    if backend is None or not keys:
+        return
+
+    backend.delete(*keys)
+    CACHE_INVALIDATIONS_TOTAL.labels(service=service_name()).inc(len(keys))
+
+
+def invalidate_kinds(*kinds):
+    """Drop every cached entity of ``kinds`` (e.g. after a bulk import).
+
+    Only reaches a shared backend; in-process caches of other processes
+    expire within ``CACHE_TTL_SECONDS``.
+    """
+    backend = current_app.extensions.get("entity_cache")
+    if backend is None:
+        return
+    for kind in set(kinds):
+        deleted = backend.delete_prefix(entity_key(kind, ""))
+        CACHE_INVALIDATIONS_TOTAL.labels(service=service_name()).inc(deleted)
@@ -0,0 +1,452 @@
+"""
+    Bulk catalog import for ``flask import-catalog``.
+
+    Each input file (CSV with a header row, or NDJSON; ``.gz`` is read
+    transparently) is streamed into a temporary staging table, through
+    ``COPY ... FROM STDIN`` on Postgres or chunked multi-row inserts
+    elsewhere. Set-based ``INSERT ... SELECT ... ON CONFLICT`` statements then
+    merge the staging tables into ``stores``, ``tags``, ``items`` and
+    ``items_tags``. Memory use does not depend on the file size. Everything
+    runs in one transaction, so a failed import leaves the catalog untouched.
+
+    Rows are matched by their unique ``name``; items and tags refer to stores
+    by name and links refer to items and tags by name. Within a file the last
+    row for a name wins, as in ``POST /item/bulk``.
+"""
+import csv
+import gzip
+import io
+import json
+import sys
+import time
+from itertools import islice
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Float,
+    MetaData,
+    Table,
+    Text,
+    except_,
+    exists,
+    func,
+    insert,
+    or_,
+    select,
+    text,
+    union,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+
+from cache import invalidate_kinds
+from db import db
+from models import (
+    ItemModel,
+    ItemTags,
+    StoreModel,
+    TagModel,
+    bump_table_versions,
+    store_counts_update,
+)
+
+
+FORMATS = ("csv", "ndjson")
+INSERT_CHUNK_SIZE = 5000
+COPY_READ_ROWS = 1000
+DEFAULT_PROGRESS_EVERY = 100_000
+MAX_REPORTED_ERRORS = 10
+
+UPSERT_DIALECTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+_staging = MetaData()
+
+
+def _staging_table(name, *columns):
+    return Table(
+        f"import_{name}",
+        _staging,
+        Column("line", BigInteger, nullable=False),
+        *columns,
+        prefixes=["TEMPORARY"],
+    )
+
+
+def _name(limit):
+    def parse(value):
+        value = "" if value is None else str(value).strip()
+        if not value:
+            raise ValueError("is required")
+        if limit and len(value) > limit:
+            raise ValueError(f"is longer than {limit} characters")
+        return value
+    return parse
+
+
+def _price(value):
+    if value is None or value == "":
+        raise ValueError("is required")
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        raise ValueError("must be a number") from None
+    if price != price or price in (float("inf"), float("-inf")):
+        raise ValueError("must be a finite number")
+    return price
+
+
+class Entity:
+    """An importable file kind: input field parsers (in staging column order,
+    raising ``ValueError`` on bad input) and its staging table."""
+
+    def __init__(self, name, fields, table):
+        self.name = name
+        self.fields = fields
+        self.table = table
+
+
+ENTITIES = {
+    "stores": Entity(
+        "stores",
+        {"name": _name(StoreModel.__table__.c.name.type.length)},
+        _staging_table("stores", Column("name", Text)),
+    ),
+    "tags": Entity(
+        "tags",
+        {
+            "name": _name(TagModel.__table__.c.name.type.length),
+            "store": _name(None),
+        },
+        _staging_table("tags", Column("name", Text), Column("store", Text)),
+    ),
+    "items": Entity(
+        "items",
+        {
+            "name": _name(ItemModel.__table__.c.name.type.length),
+            "price": _price,
+            "store": _name(None),
+        },
+        _staging_table("items", Column("name", Text), Column("price", Float), Column("store", Text)),
+    ),
+    "links": Entity(
+        "links",
+        {"item": _name(None), "tag": _name(None)},
+        _staging_table("links", Column("item", Text), Column("tag", Text)),
+    ),
+}
+# Merge order: tags and items need their stores, links need items and tags.
+IMPORT_ORDER = ("stores", "tags", "items", "links")
+# Cached entity kinds whose responses change when an entity's rows change.
+STALE_KINDS = {
+    "stores": (),
+    "tags": ("tag", "store"),
+    "items": ("item", "store"),
+    "links": ("item",),
+}
+# Tables whose list ETags change when an entity merges any rows.
+CHANGED_TABLES = {
+    "stores": ("stores",),
+    "tags": ("tags", "stores"),
+    "items": ("items", "stores"),
+    "links": ("items",),
+}
+
+
+class ImportStats:
+    def __init__(self, entity):
+        self.entity = entity
+        self.read = 0
+        self.invalid = 0
+        self.unresolved = 0
+        self.merged = 0
+        self.errors = []
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def invalid_row(self, line, message):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"{self.entity} line {line}: {message}")
+
+    @property
+    def rate(self):
+        return self.read / self.elapsed if self.elapsed else 0.0
+
+
+def detect_format(path, file_format=None):
+    if file_format:
+        return file_format
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "csv"
+
+
+def _open(path):
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+
+def _records(file, file_format):
+    """``(line, record_or_error)`` for each non-empty input row."""
+    if file_format == "csv":
+        reader = csv.DictReader(file)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line, raw in enumerate(file, start=1):
+        if not raw.strip():
+            continue
+        try:
+            record = json.loads(raw)
+        except ValueError:
+            yield line, ValueError("invalid JSON")
+            continue
+        yield line, record if isinstance(record, dict) else ValueError("expected a JSON object")
+
+
+def staging_rows(entity, file, file_format, stats, progress=None):
+    """Validated staging tuples ``(line, *fields)``; bad rows go to ``stats``."""
+    fields = entity.fields
+    for line, record in _records(file, file_format):
+        stats.read += 1
+        if progress is not None:
+            progress(stats)
+        if isinstance(record, ValueError):
+            stats.invalid_row(line, str(record))
+            continue
+        try:
+            values = []
+            for field, parse in fields.items():
+                try:
+                    values.append(parse(record.get(field)))
+                except (TypeError, ValueError) as error:
+                    raise ValueError(f"{field} {error}") from None
+        except ValueError as error:
+            stats.invalid_row(line, str(error))
+            continue
+        yield (line, *values)
+
+
+class _CsvReader:
+    """Read-only file over staging rows encoded as CSV, for ``copy_expert``."""
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator="\n")
+        self._pending = ""
+
+    def read(self, size=-1):
+        while size < 0 or len(self._pending) < size:
+            batch = list(islice(self._rows, COPY_READ_ROWS))
+            if not batch:
+                break
+            self._writer.writerows(batch)
+            self._pending += self._buffer.getvalue()
+            self._buffer.seek(0)
+            self._buffer.truncate()
+        if size < 0:
+            size = len(self._pending)
+        chunk, self._pending = self._pending[:size], self._pending[size:]
+        return chunk
+
+    def readline(self, size=-1):
+        return self.read(size)
+
+
+def _load_staging(connection, table, rows):
+    columns = [column.name for column in table.columns]
+    if connection.dialect.name == "postgresql":
+        cursor = connection.connection.driver_connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+                _CsvReader(rows),
+            )
+        finally:
+            cursor.close()
+        # Autovacuum never analyzes temporary tables; the merges need row counts.
+        connection.execute(text(f"ANALYZE {table.name}"))
+        return
+
+    rows = iter(rows)
+    while True:
+        chunk = [dict(zip(columns, row)) for row in islice(rows, INSERT_CHUNK_SIZE)]
+        if not chunk:
+            return
+        connection.execute(insert(table), chunk)
+
+
+def _latest(staging, key):
+    """Staging rows keeping only the last line for each ``key``."""
+    rank = func.row_number().over(partition_by=staging.c[key], order_by=staging.c.line.desc())
+    ranked = select(staging, rank.label("rank")).subquery()
+    return select(ranked).where(ranked.c.rank == 1).subquery()
+
+
+def _bump_store_versions(connection, store_ids):
+    stores = StoreModel.__table__
+    connection.execute(
+        update(stores).where(stores.c.id.in_(store_ids)).values(version=stores.c.version + 1)
+    )
+
+
+def _merge_stores(connection, upsert, staging):
+    stores = StoreModel.__table__
+    names = select(staging.c.name).distinct().where(staging.c.name.is_not(None))
+    statement = upsert(stores).from_select(["name"], names).on_conflict_do_nothing(
+        index_elements=[stores.c.name]
+    )
+    return connection.execute(statement).rowcount, 0
+
+
+def _merge_owned(connection, upsert, staging, model, values):
+    """Upsert tags or items (``values``: extra staging columns) resolved to store ids."""
+    stores = StoreModel.__table__
+    table = model.__table__
+    latest = _latest(staging, "name")
+    resolved = (
+        select(latest.c.name, *(latest.c[name] for name in values), stores.c.id.label("store_id"))
+        .join(stores, stores.c.name == latest.c.store)
+        # SQLite needs a WHERE to parse INSERT ... SELECT ... ON CONFLICT.
+        .where(latest.c.name.is_not(None))
+    )
+    unresolved = connection.execute(
+        select(func.count()).select_from(latest).where(
+            ~exists().where(stores.c.name == latest.c.store)
+        )
+    ).scalar_one()
+
+    # Stores whose embedded items/tags change: the old and new owners of rows
+    # the upsert will actually change, and the owners of new rows. Same
+    # predicate as the upsert's WHERE, so a re-run bumps nothing.
+    staged = resolved.subquery()
+    differs = [table.c.store_id != staged.c.store_id]
+    differs.extend(table.c[name] != staged.c[name] for name in values)
+    changed = select(table.c.store_id, staged.c.store_id.label("new_store_id")).join(
+        table, table.c.name == staged.c.name
+    ).where(or_(*differs)).subquery()
+    _bump_store_versions(
+        connection,
+        union(
+            select(changed.c.store_id),
+            select(changed.c.new_store_id),
+            select(staged.c.store_id).where(~exists().where(table.c.name == staged.c.name)),
+        ),
+    )
+
+    statement = upsert(table).from_select(["name", *values, "store_id"], resolved)
+    changed = [table.c.store_id != statement.excluded.store_id]
+    changed.extend(table.c[name] != statement.excluded[name] for name in values)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.name],
+        set_={
+            **{name: statement.excluded[name] for name in (*values, "store_id")},
+            "version": table.c.version + 1,
+        },
+        where=or_(*changed),
+    )
+    return connection.execute(statement).rowcount, unresolved
+
+
+def _merge_links(connection, upsert, staging):
+    items = ItemModel.__table__
+    tags = TagModel.__table__
+    links = ItemTags.__table__
+    # EXCEPT also drops duplicate pairs, and plans as one set operation
+    # rather than a probe of items_tags per staged row.
+    pairs = except_(
+        select(items.c.id.label("item_id"), tags.c.id.label("tag_id")).select_from(
+            staging.join(items, items.c.name == staging.c.item).join(tags, tags.c.name == staging.c.tag)
+        ),
+        select(links.c.item_id, links.c.tag_id),
+    )
+    unresolved = connection.execute(
+        select(func.count()).select_from(staging).where(
+            or_(
+                ~exists().where(items.c.name == staging.c.item),
+                ~exists().where(tags.c.name == staging.c.tag),
+            )
+        )
+    ).scalar_one()
+
+    # Item ETags cover the item's tags; new links change the item.
+    new_pairs = pairs.subquery()
+    connection.execute(
+        update(items)
+        .where(items.c.id.in_(select(new_pairs.c.item_id)))
+        .values(version=items.c.version + 1)
+    )
+    merged = connection.execute(insert(links).from_select(["item_id", "tag_id"], pairs)).rowcount
+    return merged, unresolved
+
+
+def _merge(connection, entity, upsert):
+    staging = entity.table
+    if entity.name == "stores":
+        return _merge_stores(connection, upsert, staging)
+    if entity.name == "tags":
+        return _merge_owned(connection, upsert, staging, TagModel, [])
+    if entity.name == "items":
+        return _merge_owned(connection, upsert, staging, ItemModel, ["price"])
+    return _merge_links(connection, upsert, staging)
+
+
+def import_catalog(sources, file_format=None, progress_every=DEFAULT_PROGRESS_EVERY, echo=print):
+    """Import ``sources`` (``{entity: path}``) in one transaction.
+
+    Returns ``ImportStats`` per entity, in import order.
+    """
+    upsert = UPSERT_DIALECTS.get(db.engine.dialect.name)
+    if upsert is None:
+        raise ValueError(f"Catalog import is not supported on {db.engine.dialect.name}.")
+
+    def progress(stats):
+        if progress_every and stats.read % progress_every == 0:
+            elapsed = time.perf_counter() - stats.started
+            echo(f"{stats.entity}: {stats.read:,} rows read ({stats.read / elapsed:,.0f} rows/s)")
+
+    results = []
+    with db.engine.begin() as connection:
+        for name in IMPORT_ORDER:
+            path = sources.get(name)
+            if path is None:
+                continue
+            entity = ENTITIES[name]
+            stats = ImportStats(name)
+            entity.table.create(connection)
+            try:
+                with _open(path) as file:
+                    rows = staging_rows(entity, file, detect_format(path, file_format), stats, progress)
+                    _load_staging(connection, entity.table, rows)
+                stats.merged, stats.unresolved = _merge(connection, entity, upsert)
+            finally:
+                entity.table.drop(connection)
+            stats.elapsed = time.perf_counter() - stats.started
+            results.append(stats)
+            echo(
+                f"{name}: {stats.read:,} rows read, {stats.merged:,} inserted or changed, "
+                f"{stats.invalid:,} invalid, {stats.unresolved:,} unresolved "
+                f"in {stats.elapsed:.1f}s ({stats.rate:,.0f} rows/s)"
+            )
+            for error in stats.errors:
+                echo(f"  {error}")
+
+        if any(stats.entity in ("tags", "items") for stats in results):
+            connection.execute(store_counts_update())
+        bump_table_versions(
+            connection,
+            {name for stats in results if stats.merged for name in CHANGED_TABLES[stats.entity]},
+        )
+
+    # Too many rows may have changed to invalidate them one key at a time.
+    invalidate_kinds(*(kind for stats in results if stats.merged for kind in STALE_KINDS[stats.entity]))
+    return results
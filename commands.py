@@ -0,0 +1,101 @@
+import click
+from flask.cli import with_appcontext
+
+from blocklist import prune_revoked_tokens
+from catalog_import import DEFAULT_PROGRESS_EVERY, FORMATS, import_catalog
+from db import db
+from models import store_counts_update
+
+
+def reconcile_store_counts():
+    """Rebuild ``stores.item_count``/``tag_count`` from the child tables.
+
+    Returns the number of stores whose counters were wrong.
+    """
+    result = db.session.execute(store_counts_update())
+    db.session.commit()
+    return result.rowcount
+
+
+@click.command("reconcile-store-counts")
+@with_appcontext
+def reconcile_store_counts_command():
+    """Recompute the denormalized per-store item and tag counters."""
+    fixed = reconcile_store_counts()
+    click.echo(f"Reconciled store counters; {fixed} store(s) corrected.")
+
+
+@click.command("prune-revoked-tokens")
+@with_appcontext
+def prune_revoked_tokens_command():
+    """Delete revocation records for tokens that have already expired."""
+    pruned = prune_revoked_tokens()
+    db.session.commit()
+    click.echo(f"Pruned {pruned} expired token revocation(s).")
+
+
+_import_path = click.Path(exists=True, dir_okay=False, allow_dash=True)
+
+
+@click.command("import-catalog")
+@click.option("--stores", "stores_path", type=_import_path, help="Store rows: name.")
+@click.option("--tags", "tags_path", type=_import_path, help="Tag rows: name, store (store name).")
+@click.option(
+    "--items", "items_path", type=_import_path, help="Item rows: name, price, store (store name)."
+)
+@click.option(
+    "--links", "links_path", type=_import_path, help="Item-tag links: item, tag (names)."
+)
+@click.option(
+    "--format",
+    "file_format",
+    type=click.Choice(FORMATS),
+    help="Input format; by default taken from each file's extension (.ndjson/.jsonl, else CSV).",
+)
+@click.option(
+    "--progress-every",
+    type=int,
+    default=DEFAULT_PROGRESS_EVERY,
+    show_default=True,
+    help="Report progress every N rows read (0 disables).",
+)
+@with_appcontext
+def import_catalog_command(stores_path, tags_path, items_path, links_path, file_format, progress_every):
+    """Bulk-load stores, tags, items and item-tag links from CSV or NDJSON files.
+
+    Rows are upserted by name; items and tags name their store, links name
+    their item and tag. Use "-" to read one of the files from stdin.
+    """
+    sources = {
+        "stores": stores_path,
+        "tags": tags_path,
+        "items": items_path,
+        "links": links_path,
+    }
+    sources = {entity: path for entity, path in sources.items() if path is not None}
+    if not sources:
+        raise click.UsageError("Pass at least one of --stores, --tags, --items or --links.")
+    if list(sources.values()).count("-") > 1:
+        raise click.UsageError("Only one file can be read from stdin.")
+
+    try:
+        results = import_catalog(
+            sources,
+            file_format=file_format,
+            progress_every=progress_every,
+            echo=lambda message: click.echo(message, err=True),
+        )
+    except ValueError as error:
+        raise click.ClickException(str(error))
+    total = sum(stats.read for stats in results)
+    elapsed = sum(stats.elapsed for stats in results)
+    click.echo(
+        f"Imported {total:,} row(s) in {elapsed:.1f}s "
+        f"({total / elapsed if elapsed else 0:,.0f} rows/s)."
+    )
+
+
+def register_commands(app):
+    app.cli.add_command(reconcile_store_counts_command)
+    app.cli.add_command(prune_revoked_tokens_command)
+    app.cli.add_command(import_catalog_command)
@@ -0,0 +1,199 @@
+"""
+    ``Accept-Encoding`` negotiation for API responses.
+
+    Buffered responses are compressed in one shot when they reach
+    ``COMPRESSION_MIN_SIZE``; streamed responses (exports) are always
+    compressed, chunk by chunk, with a sync flush after each chunk so clients
+    keep receiving rows as they are produced. gzip is always available; br and
+    zstd are offered when the ``brotli`` / ``zstandard`` packages are installed.
+"""
+import os
+import zlib
+
+from flask import request
+
+from metrics import (
+    RESPONSE_BYTES_COMPRESSED_TOTAL,
+    RESPONSE_BYTES_UNCOMPRESSED_TOTAL,
+    service_name,
+)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_LEVELS = {"gzip": 6, "br": 4, "zstd": 3}
+DEFAULT_ENCODINGS = "zstd,br,gzip"
+COMPRESSIBLE_MIMETYPES = frozenset(
+    {
+        "application/json",
+        "application/x-ndjson",
+        "application/openmetrics-text",
+        "text/csv",
+        "text/html",
+        "text/plain",
+    }
+)
+
+
+class _GzipCompressor:
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliCompressor:
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class _ZstdCompressor:
+    def __init__(self, level):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+COMPRESSORS = {"gzip": _GzipCompressor}
+if brotli is not None:
+    COMPRESSORS["br"] = _BrotliCompressor
+if zstandard is not None:
+    COMPRESSORS["zstd"] = _ZstdCompressor
+
+
+def _count(encoding, uncompressed, compressed):
+    RESPONSE_BYTES_UNCOMPRESSED_TOTAL.labels(service=service_name(), encoding=encoding).inc(
+        uncompressed
+    )
+    RESPONSE_BYTES_COMPRESSED_TOTAL.labels(service=service_name(), encoding=encoding).inc(
+        compressed
+    )
+
+
+def _compressed_stream(chunks, encoding, compressor):
+    uncompressed = compressed = 0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            if not chunk:
+                continue
+            uncompressed += len(chunk)
+            data = compressor.compress(chunk) + compressor.flush()
+            compressed += len(data)
+            yield data
+        data = compressor.finish()
+        compressed += len(data)
+        yield data
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+        _count(encoding, uncompressed, compressed)
+
+
+def _negotiate(encodings):
+    accepted = request.accept_encodings
+    if not accepted:
+        return None
+    return accepted.best_match(encodings)
+
+
+def compress_response(response, config):
+    if (
+        response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = _negotiate(config["encodings"])
+    if encoding is None:
+        return response
+    compressor = COMPRESSORS[encoding](config["levels"][encoding])
+
+    if response.is_streamed:
+        response.response = _compressed_stream(response.response, encoding, compressor)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < config["min_size"]:
+            return response
+        compressed = compressor.compress(data) + compressor.finish()
+        _count(encoding, len(data), len(compressed))
+        response.set_data(compressed)
+
+    response.headers["Content-Encoding"] = encoding
+    # The bytes now differ per encoding; a weak ETag still validates against
+    # the entity's version (``If-None-Match`` uses weak comparison).
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    app.config.setdefault(
+        "COMPRESSION_MIN_SIZE", int(os.getenv("COMPRESSION_MIN_SIZE", DEFAULT_MIN_SIZE))
+    )
+    app.config.setdefault(
+        "COMPRESSION_ENCODINGS", os.getenv("COMPRESSION_ENCODINGS", DEFAULT_ENCODINGS)
+    )
+    for encoding, level in DEFAULT_LEVELS.items():
+        name = f"COMPRESSION_{encoding.upper()}_LEVEL"
+        app.config.setdefault(name, int(os.getenv(name, level)))
+
+    encodings = [
+        encoding.strip()
+        for encoding in app.config["COMPRESSION_ENCODINGS"].split(",")
+        if encoding.strip() in COMPRESSORS
+    ]
+    config = {
+        "encodings": encodings,
+        "levels": {
+            encoding: app.config[f"COMPRESSION_{encoding.upper()}_LEVEL"]
+            for encoding in DEFAULT_LEVELS
+        },
+        "min_size": app.config["COMPRESSION_MIN_SIZE"],
+    }
+    if not encodings:
+        return
+
+    @app.after_request
+    def negotiate_compression(response):
+        return compress_response(response, config)
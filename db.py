@@ -1,3 +1,27 @@
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select
 
-db = SQLAlchemy()
\ No newline at end of file
+
+class RoutingSession(Session):
+    """Session that sends plain SELECTs to the read replica chosen for the
+    current request (``g.db_read_bind``, set by ``replicas.py``).
+
+    Flushes, DML, ``SELECT ... FOR UPDATE`` and textual SQL always use the
+    primary, as does everything outside a request that picked a replica.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context():
+            read_bind = g.get("db_read_bind")
+            if (
+                read_bind is not None
+                and isinstance(clause, Select)
+                and clause._for_update_arg is None
+            ):
+                return self._db.engines[read_bind]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
@@ -8,25 +8,36 @@ CREATE TABLE IF NOT EXISTS users (
 -- Create the stores table
 CREATE TABLE IF NOT EXISTS stores (
     id SERIAL PRIMARY KEY,
-    name VARCHAR(80) UNIQUE NOT NULL
+    name VARCHAR(80) UNIQUE NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1,
+    item_count INTEGER NOT NULL DEFAULT 0,
+    tag_count INTEGER NOT NULL DEFAULT 0
 );
 
+-- Trigram index backing the ranked ILIKE search on /store/search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS ix_stores_name_trgm ON stores USING gin (name gin_trgm_ops);
+
 -- Create the items table
 CREATE TABLE IF NOT EXISTS items (
     id SERIAL PRIMARY KEY,
     name VARCHAR(80) UNIQUE NOT NULL,
     price DOUBLE PRECISION NOT NULL,
     store_id INTEGER NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1,
     FOREIGN KEY (store_id) REFERENCES stores(id) ON DELETE CASCADE
 );
+CREATE INDEX IF NOT EXISTS ix_items_store_id ON items (store_id);
 
 -- Create the tags table
 CREATE TABLE IF NOT EXISTS tags (
     id SERIAL PRIMARY KEY,
     name VARCHAR(88) UNIQUE NOT NULL,
     store_id INTEGER NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1,
     FOREIGN KEY (store_id) REFERENCES stores(id)
 );
+CREATE INDEX IF NOT EXISTS ix_tags_store_id ON tags (store_id);
 
 -- Create the items_tags junction table
 CREATE TABLE IF NOT EXISTS items_tags (
@@ -34,5 +45,49 @@ CREATE TABLE IF NOT EXISTS items_tags (
     item_id INTEGER NOT NULL,
     tag_id INTEGER NOT NULL,
     FOREIGN KEY (item_id) REFERENCES items(id),
-    FOREIGN KEY (tag_id) REFERENCES tags(id)
-);
\ No newline at end of file
+    FOREIGN KEY (tag_id) REFERENCES tags(id),
+    CONSTRAINT uq_items_tags_item_id_tag_id UNIQUE (item_id, tag_id)
+);
+CREATE INDEX IF NOT EXISTS ix_items_tags_item_id ON items_tags (item_id);
+CREATE INDEX IF NOT EXISTS ix_items_tags_tag_id ON items_tags (tag_id);
+
+-- Track background deletions of large stores
+CREATE TABLE IF NOT EXISTS store_deletion_jobs (
+    id VARCHAR(36) PRIMARY KEY,
+    store_id INTEGER NOT NULL,
+    status VARCHAR(16) NOT NULL,
+    items_total INTEGER NOT NULL,
+    tags_total INTEGER NOT NULL,
+    items_moved INTEGER NOT NULL,
+    tags_moved INTEGER NOT NULL,
+    error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_store_deletion_jobs_store_id ON store_deletion_jobs (store_id);
+
+-- Revoked JWTs, kept until the token's own expiry
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    jti VARCHAR(36) PRIMARY KEY,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    revoked_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS ix_revoked_tokens_expires_at ON revoked_tokens (expires_at);
+CREATE INDEX IF NOT EXISTS ix_revoked_tokens_revoked_at ON revoked_tokens (revoked_at);
+
+-- Change counters behind the list ETags, bumped by every write transaction
+CREATE TABLE IF NOT EXISTS table_versions (
+    name VARCHAR(32) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+INSERT INTO table_versions (name, version) VALUES ('items', 0), ('stores', 0), ('tags', 0)
+ON CONFLICT DO NOTHING;
+
+-- This script builds the schema at the latest migration; record that so
+-- `flask db upgrade` and the startup head check agree with it.
+CREATE TABLE IF NOT EXISTS alembic_version (
+    version_num VARCHAR(32) NOT NULL,
+    CONSTRAINT alembic_version_pkc PRIMARY KEY (version_num)
+);
+INSERT INTO alembic_version (version_num) VALUES ('f1a8d3c6b2e9')
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,152 @@
+"""
+    Connection pool settings and pool instrumentation.
+
+    Pool sizing comes from ``DB_POOL_*`` environment variables and is handed to
+    Flask-SQLAlchemy as ``SQLALCHEMY_ENGINE_OPTIONS``. Pool events drive the
+    checked-out gauge and the connect/invalidate counters; the pool class
+    times how long each checkout waits and tracks overflow, since checkin
+    events fire before the connection is actually back in the pool.
+"""
+import os
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from metrics import (
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_CHECKOUT_TIMEOUTS_TOTAL,
+    DB_POOL_CHECKOUT_WAIT_SECONDS,
+    DB_POOL_CONNECTIONS_OPENED_TOTAL,
+    DB_POOL_INVALIDATIONS_TOTAL,
+    DB_POOL_OVERFLOW,
+    service_name,
+)
+
+
+DEFAULT_POOL_SIZE = 5
+DEFAULT_MAX_OVERFLOW = 10
+DEFAULT_POOL_TIMEOUT = 30
+DEFAULT_POOL_RECYCLE = 1800
+
+
+def _env_bool(name, default):
+    return os.getenv(name, str(default)).lower() in {"1", "true", "yes", "on"}
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records checkout wait time and overflow usage."""
+
+    engine_name = "primary"
+
+    def _record_overflow(self):
+        DB_POOL_OVERFLOW.labels(service=service_name(), engine=self.engine_name).set(
+            max(self.overflow(), 0)
+        )
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+            self._record_overflow()
+            return connection
+        except PoolTimeoutError:
+            DB_POOL_CHECKOUT_TIMEOUTS_TOTAL.labels(
+                service=service_name(), engine=self.engine_name
+            ).inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_WAIT_SECONDS.labels(
+                service=service_name(), engine=self.engine_name
+            ).observe(time.perf_counter() - started)
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        self._record_overflow()
+
+    def recreate(self):
+        # ``engine.dispose()`` (e.g. after a fork) swaps in a recreated pool;
+        # listeners carry over through the dispatcher, the label must too.
+        pool = super().recreate()
+        pool.engine_name = self.engine_name
+        return pool
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    """The same instrumentation for an ``AsyncEngine``'s pool."""
+
+
+def configure_pool(app):
+    """Populate ``SQLALCHEMY_ENGINE_OPTIONS``; call before ``db.init_app``."""
+    app.config.setdefault("DB_POOL_SIZE", int(os.getenv("DB_POOL_SIZE", DEFAULT_POOL_SIZE)))
+    app.config.setdefault(
+        "DB_POOL_MAX_OVERFLOW", int(os.getenv("DB_POOL_MAX_OVERFLOW", DEFAULT_MAX_OVERFLOW))
+    )
+    app.config.setdefault(
+        "DB_POOL_TIMEOUT", float(os.getenv("DB_POOL_TIMEOUT", DEFAULT_POOL_TIMEOUT))
+    )
+    app.config.setdefault(
+        "DB_POOL_RECYCLE", int(os.getenv("DB_POOL_RECYCLE", DEFAULT_POOL_RECYCLE))
+    )
+    app.config.setdefault("DB_POOL_PRE_PING", _env_bool("DB_POOL_PRE_PING", True))
+
+    options = app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {})
+    for key, value in pool_options(app, app.config["SQLALCHEMY_DATABASE_URI"]).items():
+        options.setdefault(key, value)
+
+
+def pool_options(app, url, poolclass=InstrumentedQueuePool):
+    """Engine options for a pool on ``url``, from the ``DB_POOL_*`` settings.
+
+    Flask-SQLAlchemy only applies ``SQLALCHEMY_ENGINE_OPTIONS`` to the default
+    engine; binds (read replicas) and the ASGI app's async engine take these
+    explicitly.
+    """
+    options = {
+        "pool_pre_ping": app.config["DB_POOL_PRE_PING"],
+        "pool_recycle": app.config["DB_POOL_RECYCLE"],
+    }
+    if str(url).startswith("sqlite"):
+        # SQLite uses a singleton or static pool that takes no sizing options.
+        return options
+    options.update(
+        poolclass=poolclass,
+        pool_size=app.config["DB_POOL_SIZE"],
+        max_overflow=app.config["DB_POOL_MAX_OVERFLOW"],
+        pool_timeout=app.config["DB_POOL_TIMEOUT"],
+    )
+    return options
+
+
+def instrument_engine(engine, name="primary"):
+    """Attach pool event listeners that export ``engine``'s pool state."""
+    pool = engine.pool
+    if isinstance(pool, InstrumentedQueuePool):
+        pool.engine_name = name
+
+    checked_out = DB_POOL_CHECKED_OUT.labels(service=service_name(), engine=name)
+
+    @event.listens_for(pool, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        DB_POOL_CONNECTIONS_OPENED_TOTAL.labels(service=service_name(), engine=name).inc()
+
+    @event.listens_for(pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_out.inc()
+
+    @event.listens_for(pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        checked_out.dec()
+
+    @event.listens_for(pool, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        DB_POOL_INVALIDATIONS_TOTAL.labels(
+            service=service_name(), engine=name, kind="hard"
+        ).inc()
+
+    @event.listens_for(pool, "soft_invalidate")
+    def on_soft_invalidate(dbapi_connection, connection_record, exception):
+        DB_POOL_INVALIDATIONS_TOTAL.labels(
+            service=service_name(), engine=name, kind="soft"
+        ).inc()
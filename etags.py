@@ -0,0 +1,94 @@
+import hashlib
+from functools import lru_cache
+
+from flask import Response, request
+from marshmallow import fields
+from sqlalchemy import select
+
+from db import db
+from models import TableVersionModel
+
+LIST_TABLES = {"item": "items", "store": "stores", "tag": "tags"}
+# Nested fields of the response schemas and the tables they are read from.
+NESTED_TABLES = {"store": "stores", "items": "items", "tags": "tags"}
+
+
+def make_etag(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def item_etag(item):
+    return make_etag(
+        "item",
+        item.id,
+        item.version,
+        item.store_id,
+        item.store.version if item.store else None,
+        sorted((tag.id, tag.version) for tag in item.tags),
+    )
+
+
+def store_etag(store):
+    # Store versions are bumped whenever one of the store's items or tags
+    # changes, so the store's own version covers its embedded collections.
+    return make_etag("store", store.id, store.version)
+
+
+def tag_etag(tag):
+    return make_etag(
+        "tag",
+        tag.id,
+        tag.version,
+        tag.store_id,
+        tag.store.version if tag.store else None,
+    )
+
+
+@lru_cache(maxsize=256)
+def list_tables(kind, schema):
+    """Tables whose rows a ``kind`` list rendered with ``schema`` shows: the
+    listed table plus the tables of the nested fields ``schema`` dumps."""
+    if isinstance(schema, type):
+        schema = schema()
+    tables = {LIST_TABLES[kind]}
+    for name, field in schema.dump_fields.items():
+        if isinstance(field, fields.List):
+            field = field.inner
+        if isinstance(field, fields.Nested):
+            tables.add(NESTED_TABLES[name])
+    return tuple(sorted(tables))
+
+
+def list_fingerprint_statement(tables):
+    """Change counters of ``tables``: a primary-key lookup per table."""
+    table = TableVersionModel.__table__
+    return (
+        select(table.c.name, table.c.version)
+        .where(table.c.name.in_(tables))
+        .order_by(table.c.name)
+    )
+
+
+def list_etag(kind, schema, fingerprint=None):
+    """ETag for a list page: the change counters of the tables it shows plus
+    the query string.
+
+    Pass ``fingerprint`` when the counters were already fetched (the async
+    views run ``list_fingerprint_statement()`` themselves).
+    """
+    if fingerprint is None:
+        fingerprint = db.session.execute(
+            list_fingerprint_statement(list_tables(kind, schema))
+        ).all()
+    return make_etag(kind, tuple(map(tuple, fingerprint)), request.query_string)
+
+
+def is_not_modified(etag):
+    # Weak comparison: compressed responses carry the same ETag marked weak.
+    return request.if_none_match.contains_weak(etag)
+
+
+def not_modified_response(etag):
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
@@ -0,0 +1,90 @@
+"""
+    Sparse fieldsets for list endpoints: ``?fields=`` and ``?embed=``.
+
+    ``fields`` names the fields to return (dotted paths reach into nested
+    objects, e.g. ``tags.name``); ``embed`` names the nested objects to
+    include, and an empty ``embed=`` drops them all. The result is a schema
+    instance restricted with ``only``, which ``loading.eager_load_options``
+    turns into ``load_only`` column lists and skipped relationships, and which
+    ``serialization.dumper`` compiles once per distinct selection.
+"""
+from functools import lru_cache
+
+from flask_smorest import abort
+from marshmallow import fields
+
+from serialization import schema_key
+
+
+def _split(value):
+    return tuple(dict.fromkeys(part.strip() for part in value.split(",") if part.strip()))
+
+
+def _is_nested(field):
+    if isinstance(field, fields.List):
+        field = field.inner
+    return isinstance(field, fields.Nested)
+
+
+def _unknown_path(schema, name):
+    """The leading part of dotted ``name`` that ``schema`` does not dump, if any."""
+    parts = name.split(".")
+    for depth, part in enumerate(parts):
+        field = schema.dump_fields.get(part)
+        if field is None:
+            return ".".join(parts[: depth + 1])
+        if depth < len(parts) - 1 and not _is_nested(field):
+            return ".".join(parts[: depth + 2])
+        if isinstance(field, fields.List):
+            field = field.inner
+        if isinstance(field, fields.Nested):
+            schema = field.schema
+    return None
+
+
+@lru_cache(maxsize=256)
+def _selected_schema(schema_class, requested_fields, embed):
+    schema = schema_class()
+    dump_fields = schema.dump_fields
+    nested = {name for name, field in dump_fields.items() if _is_nested(field)}
+
+    unknown = sorted(
+        {path for name in requested_fields or () for path in [_unknown_path(schema, name)] if path}
+    )
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}.")
+    not_nested = sorted(set(embed or ()) - nested)
+    if not_nested:
+        raise ValueError(f"Cannot embed: {', '.join(not_nested)}.")
+
+    if requested_fields is None:
+        only = [name for name in dump_fields if name not in nested]
+    else:
+        only = list(requested_fields)
+    only.extend(name for name in embed or () if name not in only)
+    if not only:
+        raise ValueError("Select at least one field.")
+    schema = schema_class(only=only)
+    # Nested schemas (and their dotted ``only`` entries) are built lazily;
+    # building the key builds them, so bad paths fail here rather than mid-query.
+    schema_key(schema)
+    return schema
+
+
+def select_schema(schema_class, selection_args):
+    """``schema_class`` itself, or an instance limited to the requested fields.
+
+    Invalid selections abort with 400 like any other bad query argument.
+    """
+    requested_fields = selection_args.get("fields")
+    embed = selection_args.get("embed")
+    if requested_fields is None and embed is None:
+        return schema_class
+    try:
+        return _selected_schema(
+            schema_class,
+            _split(requested_fields) if requested_fields is not None else None,
+            _split(embed) if embed is not None else None,
+        )
+    except ValueError as exc:
+        abort(400, message=str(exc))
@@ -0,0 +1,71 @@
+"""
+    Gunicorn settings for serving the API with several workers.
+
+    Start with: gunicorn -c gunicorn.conf.py wsgi:app
+    ASGI mode:  gunicorn -c gunicorn.conf.py -k uvicorn_worker.UvicornWorker asgi:app
+"""
+import multiprocessing
+import os
+import shutil
+
+
+# prometheus_client picks its multiprocess value backend at import time, so
+# the directory must be set before the app (and metrics.py) is loaded.
+multiproc_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", "/tmp/store-api-prometheus"
+)
+# Stale files from a previous run would be summed into /metrics; clear them
+# here because preload_app imports the app before on_starting runs.
+shutil.rmtree(multiproc_dir, ignore_errors=True)
+os.makedirs(multiproc_dir, exist_ok=True)
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+accesslog = None
+
+
+def _served_apps(server):
+    """The Flask app being served and, in ASGI mode, the async engine."""
+    served = server.app.wsgi()
+    return getattr(served, "flask_app", served), getattr(served, "async_engine", None)
+
+
+def when_ready(server):
+    # With preload_app the master ran the startup warm-up and holds the pool
+    # (and replica pools) it opened; workers open their own, so close the
+    # master's before forking.
+    if not server.cfg.preload_app:
+        return
+    from db import db
+
+    app, _ = _served_apps(server)
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def post_fork(server, worker):
+    # Connections opened in the master (preload_app) must not be shared with
+    # the workers; drop the inherited pool without closing its sockets, then
+    # warm this worker's own pool before it accepts requests.
+    from db import db
+    from warmup import warm_up
+
+    app, async_engine = _served_apps(server)
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    if async_engine is not None:
+        async_engine.sync_engine.dispose(close=False)
+    warm_up(app, steps=("pool",))
+
+
+def child_exit(server, worker):
+    from metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
@@ -0,0 +1,219 @@
+"""
+    WSGI middleware for HTTP metrics and the per-request log line.
+
+    Wrapping ``app.wsgi_app`` lets the timer run until the server has sent the
+    last byte and closed the response, so streamed bodies and teardown count
+    too. Bound metric children are cached per (method, route, status) instead
+    of being looked up with ``.labels()`` on every request. Flask hooks only
+    fill in what the middleware cannot see from the environ: the matched route
+    and the JWT identity.
+"""
+import json
+import logging
+import os
+import time
+from uuid import uuid4
+
+from flask import current_app, request
+
+import logging_setup
+from metrics import (
+    HTTP_REQUEST_DB_DURATION_SECONDS,
+    HTTP_REQUEST_DB_QUERIES,
+    HTTP_REQUEST_DURATION_SECONDS,
+    HTTP_REQUESTS_ERRORS_TOTAL,
+    HTTP_REQUESTS_IN_FLIGHT,
+    HTTP_REQUESTS_TOTAL,
+    REQUEST_DURATION_BUCKETS,
+    multiprocess_exemplars,
+    service_name,
+)
+
+
+ENVIRON_KEY = "store_api.request"
+UNMATCHED_ROUTE = "NOT_FOUND"
+# Exemplar label sets are capped at 128 characters by OpenMetrics.
+MAX_EXEMPLAR_REQUEST_ID = 64
+
+DEFAULT_ROUTE_DURATION_BUCKETS = {
+    "/export/items": (0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0),
+    "/export/stores": (0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0),
+    "/export/tags": (0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0),
+}
+
+logger = logging.getLogger("app.request")
+
+
+class RequestRecord:
+    __slots__ = (
+        "request_id",
+        "started",
+        "method",
+        "path",
+        "remote_addr",
+        "route",
+        "status",
+        "user_id",
+        "query_stats",
+        "in_flight",
+    )
+
+    def __init__(self, environ):
+        self.request_id = environ.get("HTTP_X_REQUEST_ID") or str(uuid4())
+        self.started = time.perf_counter()
+        self.method = environ.get("REQUEST_METHOD", "GET")
+        self.path = environ.get("PATH_INFO", "")
+        self.remote_addr = environ.get("REMOTE_ADDR")
+        self.route = None
+        self.status = None
+        self.user_id = None
+        self.query_stats = None
+        self.in_flight = None
+
+
+class _ResponseBody:
+    """Response iterable that reports back once the server closes it."""
+
+    def __init__(self, body, on_close):
+        self._body = body
+        self._on_close = on_close
+
+    def __iter__(self):
+        return iter(self._body)
+
+    def close(self):
+        try:
+            close = getattr(self._body, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self._on_close()
+
+
+class HttpMetricsMiddleware:
+    def __init__(self, wsgi_app, route_buckets=None):
+        self.wsgi_app = wsgi_app
+        self.route_buckets = dict(route_buckets or {})
+        self._children = {}
+        self._in_flight = {}
+        # Multiprocess values can't hold exemplars; keep them on the side.
+        self._exemplars = multiprocess_exemplars()
+
+    def __call__(self, environ, start_response):
+        record = RequestRecord(environ)
+        environ[ENVIRON_KEY] = record
+
+        def recording_start_response(status, headers, exc_info=None):
+            record.status = int(status.split(" ", 1)[0])
+            return start_response(status, headers, exc_info)
+
+        try:
+            body = self.wsgi_app(environ, recording_start_response)
+        except BaseException:
+            record.status = 500
+            self.finish(record)
+            raise
+        return _ResponseBody(body, lambda: self.finish(record))
+
+    def in_flight_child(self, method, route):
+        key = (method, route)
+        child = self._in_flight.get(key)
+        if child is None:
+            child = HTTP_REQUESTS_IN_FLIGHT.labels(
+                service=service_name(), method=method, route=route
+            )
+            self._in_flight[key] = child
+        return child
+
+    def _request_children(self, method, route, status):
+        key = (method, route, status)
+        children = self._children.get(key)
+        if children is None:
+            labels = {"service": service_name(), "method": method, "route": route}
+            status_code = str(status)
+            buckets = self.route_buckets.get(route, REQUEST_DURATION_BUCKETS)
+            duration = HTTP_REQUEST_DURATION_SECONDS.with_buckets(buckets)
+            children = (
+                HTTP_REQUESTS_TOTAL.labels(status_code=status_code, **labels),
+                HTTP_REQUESTS_ERRORS_TOTAL.labels(status_code=status_code, **labels)
+                if status >= 400
+                else None,
+                duration.labels(**labels),
+                HTTP_REQUEST_DB_QUERIES.labels(**labels),
+                HTTP_REQUEST_DB_DURATION_SECONDS.labels(**labels),
+                self._exemplars.bucket_keys("http_request_duration_seconds", labels, buckets)
+                if self._exemplars is not None
+                else None,
+            )
+            self._children[key] = children
+        return children
+
+    def finish(self, record):
+        duration_seconds = max(time.perf_counter() - record.started, 0)
+        route = record.route or UNMATCHED_ROUTE
+        status = record.status or 500
+        if record.in_flight is not None:
+            record.in_flight.dec()
+
+        total, errors, duration, db_queries, db_duration, exemplar_keys = self._request_children(
+            record.method, route, status
+        )
+        total.inc()
+        if errors is not None:
+            errors.inc()
+        exemplar = {"request_id": record.request_id[:MAX_EXEMPLAR_REQUEST_ID]}
+        duration.observe(duration_seconds, exemplar=exemplar)
+        if exemplar_keys is not None:
+            self._exemplars.record(exemplar_keys, duration_seconds, exemplar)
+
+        stats = record.query_stats
+        if stats is not None:
+            db_queries.observe(stats.count)
+            db_duration.observe(stats.duration)
+
+        duration_ms = round(duration_seconds * 1000, 2)
+        sampler = logging_setup.request_log_sampler
+        if not sampler.keep(status, duration_ms):
+            return
+        extra = {
+            "event": "http_request",
+            "request_id": record.request_id,
+            "method": record.method,
+            "route": record.route,
+            "path": record.path,
+            "status": status,
+            "duration_ms": duration_ms,
+            "db_queries": stats.count if stats is not None else None,
+            "db_time_ms": round(stats.duration * 1000, 2) if stats is not None else None,
+            "remote_addr": record.remote_addr,
+            "user_id": record.user_id,
+        }
+        if sampler.rate < 1.0 and 200 <= status < 300:
+            extra["sample_rate"] = sampler.rate
+        logger.info("HTTP request completed", extra=extra)
+
+
+def init_http_metrics(app):
+    """Wrap ``app.wsgi_app`` with the metrics middleware."""
+    route_buckets = dict(DEFAULT_ROUTE_DURATION_BUCKETS)
+    route_buckets.update(json.loads(os.getenv("HTTP_ROUTE_DURATION_BUCKETS", "{}")))
+    app.config.setdefault("HTTP_ROUTE_DURATION_BUCKETS", route_buckets)
+
+    middleware = HttpMetricsMiddleware(
+        app.wsgi_app, route_buckets=app.config["HTTP_ROUTE_DURATION_BUCKETS"]
+    )
+    app.wsgi_app = middleware
+    app.extensions["http_metrics"] = middleware
+
+
+def current_request_record():
+    return request.environ.get(ENVIRON_KEY)
+
+
+def bind_route(record):
+    """Attach the matched route to ``record`` and count it as in flight."""
+    record.route = request.url_rule.rule if request.url_rule else None
+    record.in_flight = current_app.extensions["http_metrics"].in_flight_child(
+        record.method, record.route or UNMATCHED_ROUTE
+    )
+    record.in_flight.inc()
@@ -0,0 +1,76 @@
+from functools import lru_cache
+
+from marshmallow import fields
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, load_only, selectinload
+
+from serialization import schema_key
+
+
+def _nested_schema(field):
+    if isinstance(field, fields.List):
+        field = field.inner
+    if isinstance(field, fields.Nested):
+        return field.schema
+    return None
+
+
+def _column_options(model, schema):
+    """``load_only`` for the columns ``schema`` dumps (the key is implied)."""
+    columns = inspect(model).column_attrs
+    attributes = [
+        getattr(model, field.attribute or name)
+        for name, field in schema.dump_fields.items()
+        if (field.attribute or name) in columns
+    ]
+    return (load_only(*attributes),) if attributes else ()
+
+
+def _loader_options(model, schema, sparse=False):
+    relationships = inspect(model).relationships
+    options = list(_column_options(model, schema)) if sparse else []
+    for name, field in schema.dump_fields.items():
+        nested = _nested_schema(field)
+        attribute = field.attribute or name
+        if nested is None or attribute not in relationships:
+            continue
+
+        relationship = relationships[attribute]
+        column = getattr(model, attribute)
+        # Collections go through a second IN (...) query so parent rows are not
+        # multiplied; scalar parents are joined into the main statement.
+        loader = selectinload(column) if relationship.uselist else joinedload(column)
+        nested_options = _loader_options(relationship.mapper.class_, nested, sparse)
+        options.append(loader.options(*nested_options) if nested_options else loader)
+    return tuple(options)
+
+
+@lru_cache(maxsize=None)
+def _cached_loader_options(model, schema_class):
+    return _loader_options(model, schema_class())
+
+
+_sparse_loader_options = {}
+
+
+def eager_load_options(model, schema):
+    """Loader options that fetch every relationship ``schema`` dumps.
+
+    A schema instance restricted with ``only``/``exclude`` (sparse fieldsets)
+    also limits the selected columns, at every nesting level, to the fields
+    it dumps; relationships it does not dump are not loaded at all.
+    """
+    if isinstance(schema, type) or (schema.only is None and not schema.exclude):
+        schema_class = schema if isinstance(schema, type) else type(schema)
+        return _cached_loader_options(model, schema_class)
+
+    key = (model, schema_key(schema))
+    options = _sparse_loader_options.get(key)
+    if options is None:
+        options = _sparse_loader_options[key] = _loader_options(model, schema, sparse=True)
+    return options
+
+
+def schema_query(model, schema):
+    """``model.query`` with the relationships nested by ``schema`` eager loaded."""
+    return model.query.options(*eager_load_options(model, schema))
@@ -1,64 +1,157 @@
+import atexit
 import json
 import logging
 import os
+import queue
+import random
 import sys
-from datetime import datetime, timezone
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+from metrics import LOG_RECORDS_DROPPED_TOTAL, service_name
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Attributes every LogRecord carries; anything else on a record came in
+# through ``extra=`` and is written out as a field.
+RESERVED_RECORD_ATTRS = frozenset(
+    logging.LogRecord("", logging.INFO, "", 0, "", (), None).__dict__
+) | {"message", "asctime", "taskName"}
+
+if orjson is not None:
+    def _encode(payload):
+        return orjson.dumps(payload, default=str).decode()
+else:
+    _encode = json.JSONEncoder(default=str).encode
 
 
 class JsonFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__()
+        # (second, formatted prefix), replaced as one object so threads
+        # formatting concurrently never pair a second with another's prefix.
+        self._second_prefix = (None, "")
+
+    def _timestamp(self, created):
+        second = int(created)
+        cached_second, prefix = self._second_prefix
+        if second != cached_second:
+            prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+            self._second_prefix = (second, prefix)
+        return "%s.%03dZ" % (prefix, (created - second) * 1000)
+
     def format(self, record):
         payload = {
-            "ts": datetime.now(timezone.utc)
-            .isoformat(timespec="milliseconds")
-            .replace("+00:00", "Z"),
+            "ts": self._timestamp(record.created),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
         }
 
-        for key, value in record.__dict__.items():
-            if key in {
-                "args",
-                "created",
-                "exc_info",
-                "exc_text",
-                "filename",
-                "funcName",
-                "levelname",
-                "levelno",
-                "lineno",
-                "module",
-                "msecs",
-                "message",
-                "msg",
-                "name",
-                "pathname",
-                "process",
-                "processName",
-                "relativeCreated",
-                "stack_info",
-                "thread",
-                "threadName",
-                "taskName",
-            }:
-                continue
-            payload[key] = value
+        attrs = record.__dict__
+        for key in attrs.keys() - RESERVED_RECORD_ATTRS:
+            payload[key] = attrs[key]
 
         if record.exc_info:
             payload["stacktrace"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["stacktrace"] = record.exc_text
+
+        return _encode(payload)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops (and counts) records when the buffer is full
+    rather than blocking the request thread."""
+
+    def prepare(self, record):
+        # Formatting happens on the listener thread; only freeze the message
+        # so later changes to ``args`` cannot alter it.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED_TOTAL.labels(service=service_name()).inc()
+
+
+class RequestLogSampler:
+    """Decides which ``HTTP request completed`` lines to write.
+
+    Errors and 1xx/3xx responses are always kept, as are requests slower
+    than ``slow_ms``; other 2xx lines are kept with probability ``rate``.
+    """
 
-        return json.dumps(payload, default=str)
+    def __init__(self, rate=1.0, slow_ms=None):
+        self.rate = rate
+        self.slow_ms = slow_ms
+
+    def keep(self, status, duration_ms):
+        if not 200 <= status < 300:
+            return True
+        if self.slow_ms is not None and duration_ms >= self.slow_ms:
+            return True
+        return self.rate >= 1.0 or random.random() < self.rate
+
+
+request_log_sampler = RequestLogSampler()
+_queue_listener = None
+
+
+def _stop_queue_listener():
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
+def _restart_queue_listener_in_child():
+    # The listener thread does not survive fork (Gunicorn workers); start a
+    # fresh one, with a fresh queue, in the child.
+    global _queue_listener
+    if _queue_listener is None:
+        return
+    handlers = _queue_listener.handlers
+    fresh_queue = queue.Queue(maxsize=_queue_listener.queue.maxsize)
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, DroppingQueueHandler):
+            handler.queue = fresh_queue
+    _queue_listener = QueueListener(fresh_queue, *handlers, respect_handler_level=True)
+    _queue_listener.start()
+
+
+os.register_at_fork(after_in_child=_restart_queue_listener_in_child)
+atexit.register(_stop_queue_listener)
 
 
 def setup_logging():
+    global request_log_sampler
+    global _queue_listener
+
     log_level = os.getenv("LOG_LEVEL", "INFO").upper()
     log_format = os.getenv("LOG_FORMAT", "json").lower()
     werkzeug_log_level = os.getenv("WERKZEUG_LOG_LEVEL", log_level).upper()
+    log_async = os.getenv("LOG_ASYNC", "false").lower() == "true"
+    log_queue_size = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    slow_ms = os.getenv("LOG_SLOW_REQUEST_MS")
+
+    request_log_sampler = RequestLogSampler(
+        rate=float(os.getenv("LOG_SUCCESS_SAMPLE_RATE", "1.0")),
+        slow_ms=float(slow_ms) if slow_ms else None,
+    )
 
     level = getattr(logging, log_level, logging.INFO)
     root_logger = logging.getLogger()
     root_logger.setLevel(level)
 
+    _stop_queue_listener()
     for handler in list(root_logger.handlers):
         root_logger.removeHandler(handler)
 
@@ -69,7 +162,14 @@ def setup_logging():
         stream_handler.setFormatter(
             logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s")
         )
-    root_logger.addHandler(stream_handler)
+
+    if log_async:
+        log_queue = queue.Queue(maxsize=log_queue_size)
+        root_logger.addHandler(DroppingQueueHandler(log_queue))
+        _queue_listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _queue_listener.start()
+    else:
+        root_logger.addHandler(stream_handler)
 
     logging.getLogger("werkzeug").setLevel(
         getattr(logging, werkzeug_log_level, level)
@@ -1,6 +1,23 @@
+import glob
+import json
+import logging
 import os
+import threading
+import time
 
-from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.openmetrics import exposition as openmetrics
+from prometheus_client.samples import Exemplar
+from prometheus_client.utils import floatToGoString
 
 
 SERVICE_NAME = "store-api"
@@ -23,12 +40,14 @@ SERVICE_INFO = Gauge(
     "service_info",
     "Static service metadata.",
     ["service", "version"],
+    multiprocess_mode="max",
 )
 
 HTTP_REQUESTS_IN_FLIGHT = Gauge(
     "http_requests_in_flight",
     "Current number of in-flight HTTP requests.",
     ["service", "method", "route"],
+    multiprocess_mode="livesum",
 )
 
 HTTP_REQUESTS_TOTAL = Counter(
@@ -43,9 +62,64 @@ HTTP_REQUESTS_ERRORS_TOTAL = Counter(
     ["service", "method", "route", "status_code"],
 )
 
-HTTP_REQUEST_DURATION_SECONDS = Histogram(
+
+class HistogramFamily:
+    """One histogram metric whose series may use different bucket layouts.
+
+    prometheus_client fixes buckets per metric, so each layout gets its own
+    unregistered ``Histogram`` and this collector exposes them together under
+    the shared name. ``labels()`` uses the default layout.
+    """
+
+    def __init__(self, name, documentation, labelnames, buckets, registry=REGISTRY):
+        self._metric_args = (name, documentation, labelnames)
+        self._histograms = {}
+        self.default = self.with_buckets(buckets)
+        if registry is not None:
+            registry.register(self)
+
+    def with_buckets(self, buckets):
+        buckets = tuple(float(bound) for bound in buckets)
+        histogram = self._histograms.get(buckets)
+        if histogram is None:
+            histogram = Histogram(*self._metric_args, buckets=buckets, registry=None)
+            self._histograms[buckets] = histogram
+        return histogram
+
+    def labels(self, **labels):
+        return self.default.labels(**labels)
+
+    def collect(self):
+        merged = None
+        for histogram in list(self._histograms.values()):
+            for family in histogram.collect():
+                if merged is None:
+                    merged = family
+                else:
+                    merged.samples.extend(family.samples)
+        if merged is not None:
+            yield merged
+
+
+HTTP_REQUEST_DURATION_SECONDS = HistogramFamily(
     "http_request_duration_seconds",
-    "HTTP request latency in seconds.",
+    "HTTP request latency in seconds, until the last response byte is sent.",
+    ["service", "method", "route"],
+    buckets=REQUEST_DURATION_BUCKETS,
+)
+
+DB_QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+HTTP_REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Number of database queries run per HTTP request.",
+    ["service", "method", "route"],
+    buckets=DB_QUERY_COUNT_BUCKETS,
+)
+
+HTTP_REQUEST_DB_DURATION_SECONDS = Histogram(
+    "http_request_db_duration_seconds",
+    "Total time spent in database queries per HTTP request.",
     ["service", "method", "route"],
     buckets=REQUEST_DURATION_BUCKETS,
 )
@@ -62,6 +136,18 @@ ITEMS_CREATED_TOTAL = Counter(
     ["service"],
 )
 
+ITEMS_BULK_UPSERTED_TOTAL = Counter(
+    "items_bulk_upserted_total",
+    "Total number of items inserted or updated through the bulk endpoint.",
+    ["service"],
+)
+
+ITEMS_BULK_REJECTED_TOTAL = Counter(
+    "items_bulk_rejected_total",
+    "Total number of rows rejected by the bulk item endpoint.",
+    ["service"],
+)
+
 TAGS_CREATED_TOTAL = Counter(
     "tags_created_total",
     "Total number of tags created.",
@@ -123,6 +209,159 @@ LOGOUT_TOTAL = Counter(
 )
 
 
+CACHE_HITS_TOTAL = Counter(
+    "cache_hits_total",
+    "Total number of entity cache hits.",
+    ["service", "entity"],
+)
+
+CACHE_MISSES_TOTAL = Counter(
+    "cache_misses_total",
+    "Total number of entity cache misses.",
+    ["service", "entity"],
+)
+
+CACHE_EVICTIONS_TOTAL = Counter(
+    "cache_evictions_total",
+    "Total number of entity cache evictions (capacity or TTL).",
+    ["service", "backend"],
+)
+
+CACHE_INVALIDATIONS_TOTAL = Counter(
+    "cache_invalidations_total",
+    "Total number of entity cache keys invalidated by writes.",
+    ["service"],
+)
+
+
+PASSWORD_HASH_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+
+PASSWORD_HASH_QUEUE_WAIT_SECONDS = Histogram(
+    "password_hash_queue_wait_seconds",
+    "Time password hashing jobs wait for a pool worker.",
+    ["service", "operation"],
+    buckets=PASSWORD_HASH_BUCKETS,
+)
+
+PASSWORD_HASH_DURATION_SECONDS = Histogram(
+    "password_hash_duration_seconds",
+    "Time spent hashing or verifying a password.",
+    ["service", "operation"],
+    buckets=PASSWORD_HASH_BUCKETS,
+)
+
+PASSWORD_HASH_REJECTED_TOTAL = Counter(
+    "password_hash_rejected_total",
+    "Total number of password hashing jobs rejected because the pool was saturated.",
+    ["service", "operation"],
+)
+
+
+DB_POOL_WAIT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+    30.0,
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Database connections currently checked out of the pool.",
+    ["service", "engine"],
+    multiprocess_mode="livesum",
+)
+
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections",
+    "Database connections open beyond the configured pool size.",
+    ["service", "engine"],
+    multiprocess_mode="livesum",
+)
+
+DB_POOL_CHECKOUT_WAIT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting to check a connection out of the pool.",
+    ["service", "engine"],
+    buckets=DB_POOL_WAIT_BUCKETS,
+)
+
+DB_POOL_CHECKOUT_TIMEOUTS_TOTAL = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Total number of pool checkouts that gave up after the pool timeout.",
+    ["service", "engine"],
+)
+
+DB_POOL_CONNECTIONS_OPENED_TOTAL = Counter(
+    "db_pool_connections_opened_total",
+    "Total number of new database connections opened by the pool.",
+    ["service", "engine"],
+)
+
+DB_POOL_INVALIDATIONS_TOTAL = Counter(
+    "db_pool_invalidations_total",
+    "Total number of pooled connections invalidated (hard) or marked for recycle (soft).",
+    ["service", "engine", "kind"],
+)
+
+
+DB_REPLICA_HEALTHY = Gauge(
+    "db_replica_healthy",
+    "Whether a read replica passed its last health and lag check (1) or not (0).",
+    ["service", "engine"],
+    multiprocess_mode="livemin",
+)
+
+DB_REPLICA_LAG_SECONDS = Gauge(
+    "db_replica_lag_seconds",
+    "Replication lag measured by the last replica check.",
+    ["service", "engine"],
+    multiprocess_mode="livemax",
+)
+
+DB_READ_ROUTING_TOTAL = Counter(
+    "db_read_routing_total",
+    "Total number of GET/HEAD requests by the engine their reads were routed to.",
+    ["service", "engine", "reason"],
+)
+
+
+RESPONSE_BYTES_UNCOMPRESSED_TOTAL = Counter(
+    "http_response_bytes_uncompressed_total",
+    "Total response body bytes before compression, for compressed responses.",
+    ["service", "encoding"],
+)
+
+RESPONSE_BYTES_COMPRESSED_TOTAL = Counter(
+    "http_response_bytes_compressed_total",
+    "Total response body bytes sent after compression.",
+    ["service", "encoding"],
+)
+
+
+LOG_RECORDS_DROPPED_TOTAL = Counter(
+    "log_records_dropped_total",
+    "Total number of log records dropped because the async log buffer was full.",
+    ["service"],
+)
+
+
 def configure_service_metrics():
     global SERVICE_NAME
     global SERVICE_VERSION
@@ -134,3 +373,165 @@ def configure_service_metrics():
 
 def service_name():
     return SERVICE_NAME
+
+
+EXEMPLAR_FLUSH_SECONDS = 1.0
+
+logger = logging.getLogger("app.metrics")
+
+
+class MultiProcessExemplars:
+    """Latest exemplar per histogram bucket, shared between workers.
+
+    prometheus_client's multiprocess values are mmap'd floats and drop
+    exemplars. Each worker keeps the newest exemplar per bucket in memory; a
+    background thread writes them to ``exemplars_<pid>.json`` in the
+    multiprocess directory every ``EXEMPLAR_FLUSH_SECONDS`` when they changed,
+    so request threads never wait on the disk. ``render_metrics`` attaches
+    the newest one across workers to the aggregated buckets.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._latest = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._flusher_pid = None
+
+    @staticmethod
+    def bucket_keys(name, labels, buckets):
+        """``(upper_bound, key)`` per bucket of one histogram series."""
+        bounds = [float(bound) for bound in buckets]
+        if bounds[-1] != float("inf"):
+            bounds.append(float("inf"))
+        return [
+            (bound, _sample_key(f"{name}_bucket", {**labels, "le": floatToGoString(bound)}))
+            for bound in bounds
+        ]
+
+    def record(self, bucket_keys, value, labels):
+        key = next(key for bound, key in bucket_keys if value <= bound)
+        with self._lock:
+            self._latest[key] = (labels, value, time.time())
+            self._dirty = True
+        if self._flusher_pid != os.getpid():
+            self._start_flusher()
+
+    def _start_flusher(self):
+        # Threads don't survive fork; each worker starts its own on first use.
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_forever, name="exemplar-flush", daemon=True).start()
+
+    def _flush_forever(self):
+        while True:
+            time.sleep(EXEMPLAR_FLUSH_SECONDS)
+            try:
+                self.flush()
+            except OSError:
+                logger.exception("Writing exemplars failed", extra={"event": "exemplar_flush_failed"})
+
+    def flush(self):
+        """Write the current exemplars if they changed since the last write."""
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                snapshot = dict(self._latest)
+                self._dirty = False
+            path = _exemplar_path(self.directory, os.getpid())
+            with open(f"{path}.tmp", "w") as handle:
+                json.dump(snapshot, handle)
+            os.replace(f"{path}.tmp", path)
+
+    @staticmethod
+    def load(directory):
+        """Newest exemplar per bucket key across every worker's file."""
+        newest = {}
+        for path in glob.glob(os.path.join(directory, "exemplars_*.json")):
+            try:
+                with open(path) as handle:
+                    entries = json.load(handle)
+            except (OSError, ValueError):
+                continue
+            for key, (labels, value, timestamp) in entries.items():
+                if key not in newest or newest[key].timestamp < timestamp:
+                    newest[key] = Exemplar(labels, value, timestamp)
+        return newest
+
+
+class _ExemplarCollector:
+    def __init__(self, collector, exemplars):
+        self._collector = collector
+        self._exemplars = exemplars
+
+    def collect(self):
+        for metric in self._collector.collect():
+            metric.samples = [
+                sample._replace(exemplar=self._exemplars.get(_sample_key(sample.name, sample.labels)))
+                if sample.exemplar is None
+                else sample
+                for sample in metric.samples
+            ]
+            yield metric
+
+
+def _sample_key(name, labels):
+    return json.dumps([name, sorted(labels.items())])
+
+
+def _exemplar_path(directory, pid):
+    return os.path.join(directory, f"exemplars_{pid}.json")
+
+
+_multiprocess_exemplars = None
+
+
+def multiprocess_exemplars():
+    """This process's exemplar store, or ``None`` outside multiprocess mode."""
+    global _multiprocess_exemplars
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if not directory:
+        return None
+    if _multiprocess_exemplars is None or _multiprocess_exemplars.directory != directory:
+        _multiprocess_exemplars = MultiProcessExemplars(directory)
+    return _multiprocess_exemplars
+
+
+def mark_process_dead(pid):
+    """Drop a dead worker's metric and exemplar files."""
+    multiprocess.mark_process_dead(pid)
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        try:
+            os.remove(_exemplar_path(directory, pid))
+        except FileNotFoundError:
+            pass
+
+
+def render_metrics(accept=None):
+    """Exposition for ``/metrics`` as ``(body, content_type)``.
+
+    Metrics are aggregated across workers when the server runs with
+    ``PROMETHEUS_MULTIPROC_DIR`` set. Scrapers that accept OpenMetrics get
+    that format, which is the one that carries exemplars.
+    """
+    openmetrics_requested = bool(accept and "application/openmetrics-text" in accept)
+    registry = REGISTRY
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        registry = CollectorRegistry()
+        collector = multiprocess.MultiProcessCollector(None, path=directory)
+        if openmetrics_requested:
+            # The scrape thread writes this worker's pending exemplars itself,
+            # so the ones it just recorded are not a flush interval late.
+            exemplars = multiprocess_exemplars()
+            exemplars.flush()
+            collector = _ExemplarCollector(collector, MultiProcessExemplars.load(directory))
+        registry.register(collector)
+    if openmetrics_requested:
+        return openmetrics.generate_latest(registry), openmetrics.CONTENT_TYPE_LATEST
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,36 @@
+"""trigram index on stores.name for /store/search
+
+Revision ID: 3b7e2a9d41c5
+Revises: cc639f0807ff
+Create Date: 2026-10-17 09:12:44.381502
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b7e2a9d41c5'
+down_revision = 'cc639f0807ff'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    with op.get_context().autocommit_block():
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_stores_name_trgm '
+            'ON stores USING gin (name gin_trgm_ops)'
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    with op.get_context().autocommit_block():
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_stores_name_trgm')
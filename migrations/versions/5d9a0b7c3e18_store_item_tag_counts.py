@@ -0,0 +1,38 @@
+"""denormalized item/tag counters on stores
+
+Revision ID: 5d9a0b7c3e18
+Revises: 8f1c6d2e5a47
+Create Date: 2026-10-17 13:26:51.604719
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d9a0b7c3e18'
+down_revision = '8f1c6d2e5a47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('stores', schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column('item_count', sa.Integer(), nullable=False, server_default='0')
+        )
+        batch_op.add_column(
+            sa.Column('tag_count', sa.Integer(), nullable=False, server_default='0')
+        )
+
+    op.execute(
+        'UPDATE stores SET '
+        'item_count = (SELECT count(*) FROM items WHERE items.store_id = stores.id), '
+        'tag_count = (SELECT count(*) FROM tags WHERE tags.store_id = stores.id)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('stores', schema=None) as batch_op:
+        batch_op.drop_column('tag_count')
+        batch_op.drop_column('item_count')
@@ -0,0 +1,30 @@
+"""row version columns for ETags
+
+Revision ID: 8f1c6d2e5a47
+Revises: 3b7e2a9d41c5
+Create Date: 2026-10-17 11:03:27.915230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f1c6d2e5a47'
+down_revision = '3b7e2a9d41c5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('stores', 'items', 'tags'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(
+                sa.Column('version', sa.Integer(), nullable=False, server_default='1')
+            )
+
+
+def downgrade():
+    for table in ('tags', 'items', 'stores'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('version')
@@ -0,0 +1,41 @@
+"""store deletion jobs
+
+Revision ID: a4c7e19b2d60
+Revises: 5d9a0b7c3e18
+Create Date: 2026-10-17 14:52:09.271845
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c7e19b2d60'
+down_revision = '5d9a0b7c3e18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('store_deletion_jobs',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('store_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('items_total', sa.Integer(), nullable=False),
+    sa.Column('tags_total', sa.Integer(), nullable=False),
+    sa.Column('items_moved', sa.Integer(), nullable=False),
+    sa.Column('tags_moved', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('store_deletion_jobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_store_deletion_jobs_store_id'), ['store_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('store_deletion_jobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_store_deletion_jobs_store_id'))
+
+    op.drop_table('store_deletion_jobs')
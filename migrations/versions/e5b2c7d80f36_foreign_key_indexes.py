@@ -0,0 +1,74 @@
+"""indexes on store/item/tag foreign keys and a unique items_tags pair
+
+Revision ID: e5b2c7d80f36
+Revises: c2e84f6a9b13
+Create Date: 2026-10-17 15:40:12.604118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b2c7d80f36'
+down_revision = 'c2e84f6a9b13'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ('ix_items_store_id', 'items', ('store_id',)),
+    ('ix_tags_store_id', 'tags', ('store_id',)),
+    ('ix_items_tags_item_id', 'items_tags', ('item_id',)),
+    ('ix_items_tags_tag_id', 'items_tags', ('tag_id',)),
+)
+UNIQUE_LINK = 'uq_items_tags_item_id_tag_id'
+
+
+def _drop_duplicate_links():
+    # Nothing prevented linking the same tag twice, so keep the oldest row of
+    # each pair before the unique index goes on.
+    op.execute(
+        'DELETE FROM items_tags WHERE id NOT IN '
+        '(SELECT min(id) FROM items_tags GROUP BY item_id, tag_id)'
+    )
+
+
+def upgrade():
+    _drop_duplicate_links()
+
+    if op.get_bind().dialect.name != 'postgresql':
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, list(columns))
+        with op.batch_alter_table('items_tags') as batch_op:
+            batch_op.create_unique_constraint(UNIQUE_LINK, ['item_id', 'tag_id'])
+        return
+
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+                f'ON {table} ({", ".join(columns)})'
+            )
+        op.execute(
+            f'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {UNIQUE_LINK} '
+            'ON items_tags (item_id, tag_id)'
+        )
+    # Promoting the finished index to a constraint only touches the catalog.
+    op.execute(
+        f'ALTER TABLE items_tags ADD CONSTRAINT {UNIQUE_LINK} '
+        f'UNIQUE USING INDEX {UNIQUE_LINK}'
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        with op.batch_alter_table('items_tags') as batch_op:
+            batch_op.drop_constraint(UNIQUE_LINK, type_='unique')
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table)
+        return
+
+    op.execute(f'ALTER TABLE items_tags DROP CONSTRAINT IF EXISTS {UNIQUE_LINK}')
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
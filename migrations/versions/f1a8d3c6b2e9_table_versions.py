@@ -0,0 +1,32 @@
+"""per-table change counters for list ETags
+
+Revision ID: f1a8d3c6b2e9
+Revises: e5b2c7d80f36
+Create Date: 2026-10-17 17:05:31.118274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1a8d3c6b2e9'
+down_revision = 'e5b2c7d80f36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    table_versions = op.create_table('table_versions',
+    sa.Column('name', sa.String(length=32), nullable=False),
+    sa.Column('version', sa.BigInteger(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.bulk_insert(
+        table_versions,
+        [{'name': name, 'version': 0} for name in ('items', 'stores', 'tags')],
+    )
+
+
+def downgrade():
+    op.drop_table('table_versions')
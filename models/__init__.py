@@ -2,4 +2,14 @@ from models.item import ItemModel
 from models.store import StoreModel
 from models.tag import TagModel
 from models.item_tags import ItemTags
-from models.user import UserModel
\ No newline at end of file
+from models.user import UserModel
+from models.store_deletion_job import StoreDeletionJobModel
+from models.revoked_token import RevokedTokenModel
+from models.table_version import TableVersionModel
+from models.versioned import (
+    VersionedMixin,
+    bump_store_versions,
+    bump_table_versions,
+    touch_tables,
+)
+from models.store_counts import adjust_store_counts, store_counts_update
\ No newline at end of file
@@ -1,12 +1,13 @@
 from db import db
+from models.versioned import VersionedMixin
 
-class ItemModel(db.Model):
+class ItemModel(VersionedMixin, db.Model):
     __tablename__ = "items"
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(80), unique=True, nullable=False)
     price = db.Column(db.Float(precision=2), unique=False, nullable=False)
-    store_id = db.Column(db.Integer, db.ForeignKey("stores.id"), unique=False, nullable=False)
+    store_id = db.Column(db.Integer, db.ForeignKey("stores.id"), unique=False, nullable=False, index=True)
 
     store = db.relationship("StoreModel", back_populates="items")
     db.relationship("items_tags", back_populates="items", secondary="items_tags")
@@ -2,7 +2,10 @@ from db import db
 
 class ItemTags(db.Model):
     __tablename__ = "items_tags"
+    __table_args__ = (
+        db.UniqueConstraint("item_id", "tag_id", name="uq_items_tags_item_id_tag_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    item_id = db.Column(db.Integer, db.ForeignKey("items.id"))
-    tag_id = db.Column(db.Integer, db.ForeignKey("tags.id"))
\ No newline at end of file
+    item_id = db.Column(db.Integer, db.ForeignKey("items.id"), index=True)
+    tag_id = db.Column(db.Integer, db.ForeignKey("tags.id"), index=True)
\ No newline at end of file
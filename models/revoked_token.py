@@ -0,0 +1,11 @@
+from db import db
+
+
+class RevokedTokenModel(db.Model):
+    __tablename__ = "revoked_tokens"
+
+    jti = db.Column(db.String(36), primary_key=True)
+    expires_at = db.Column(db.DateTime(timezone=True), nullable=False, index=True)
+    revoked_at = db.Column(
+        db.DateTime(timezone=True), nullable=False, server_default=db.func.now(), index=True
+    )
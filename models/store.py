@@ -1,9 +1,12 @@
 from db import db
+from models.versioned import VersionedMixin
 
-class StoreModel(db.Model):
+class StoreModel(VersionedMixin, db.Model):
     __tablename__ = "stores"
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(80), unique=True, nullable=False)
-    items = db.relationship("ItemModel", back_populates="store", lazy="dynamic", cascade="all, delete")
-    tags = db.relationship("TagModel", back_populates="store", lazy="dynamic")
\ No newline at end of file
+    item_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    tag_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    items = db.relationship("ItemModel", back_populates="store", cascade="all, delete")
+    tags = db.relationship("TagModel", back_populates="store")
\ No newline at end of file
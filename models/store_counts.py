@@ -0,0 +1,110 @@
+from collections import Counter, defaultdict
+
+from sqlalchemy import event, func, inspect, or_, select, update
+from sqlalchemy.orm import Session
+
+
+def _persisted_store_id(obj):
+    """The ``store_id`` currently stored in the database for ``obj``."""
+    history = inspect(obj).attrs.store_id.history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return obj.store_id
+
+
+def adjust_store_counts(session, item_deltas=None, tag_deltas=None):
+    """Apply ``{store_id: delta}`` changes to ``stores.item_count``/``tag_count``.
+
+    Increments are issued as ``count = count + delta`` so concurrent writers
+    never lose updates.
+    """
+    from models.store import StoreModel
+
+    item_deltas = item_deltas or {}
+    tag_deltas = tag_deltas or {}
+    mapper = inspect(StoreModel)
+    table = StoreModel.__table__
+    pending = defaultdict(set)
+
+    for store_id in set(item_deltas) | set(tag_deltas):
+        items, tags = item_deltas.get(store_id, 0), tag_deltas.get(store_id, 0)
+        if store_id is None or not (items or tags):
+            continue
+
+        store = session.identity_map.get(mapper.identity_key_from_primary_key([store_id]))
+        if store is None:
+            store = next(
+                (obj for obj in session.new if isinstance(obj, StoreModel) and obj.id == store_id),
+                None,
+            )
+
+        if store is None:
+            pending[(items, tags)].add(store_id)
+        elif store in session.new:
+            store.item_count = (store.item_count or 0) + items
+            store.tag_count = (store.tag_count or 0) + tags
+        elif store not in session.deleted:
+            store.item_count = StoreModel.item_count + items
+            store.tag_count = StoreModel.tag_count + tags
+
+    for (items, tags), store_ids in pending.items():
+        session.execute(
+            update(table)
+            .where(table.c.id.in_(store_ids))
+            .values(
+                item_count=table.c.item_count + items,
+                tag_count=table.c.tag_count + tags,
+            )
+        )
+
+
+def store_counts_update():
+    """``UPDATE`` rebuilding ``item_count``/``tag_count`` of every store whose
+    counters disagree with the child tables."""
+    from models.item import ItemModel
+    from models.store import StoreModel
+    from models.tag import TagModel
+
+    stores = StoreModel.__table__
+    item_count = (
+        select(func.count(ItemModel.id))
+        .where(ItemModel.store_id == stores.c.id)
+        .scalar_subquery()
+    )
+    tag_count = (
+        select(func.count(TagModel.id))
+        .where(TagModel.store_id == stores.c.id)
+        .scalar_subquery()
+    )
+    return (
+        update(stores)
+        .where(or_(stores.c.item_count != item_count, stores.c.tag_count != tag_count))
+        .values(item_count=item_count, tag_count=tag_count)
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def _track_store_counts(session, flush_context, instances):
+    from models.item import ItemModel
+    from models.tag import TagModel
+
+    deltas = {ItemModel: Counter(), TagModel: Counter()}
+
+    for obj in session.new:
+        if type(obj) in deltas:
+            deltas[type(obj)][obj.store_id] += 1
+
+    for obj in session.deleted:
+        if type(obj) in deltas:
+            deltas[type(obj)][_persisted_store_id(obj)] -= 1
+
+    for obj in session.dirty:
+        if type(obj) in deltas and obj not in session.deleted:
+            previous = _persisted_store_id(obj)
+            if previous != obj.store_id:
+                deltas[type(obj)][previous] -= 1
+                deltas[type(obj)][obj.store_id] += 1
+
+    adjust_store_counts(session, deltas[ItemModel], deltas[TagModel])
@@ -0,0 +1,22 @@
+from datetime import datetime, timezone
+
+from db import db
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+class StoreDeletionJobModel(db.Model):
+    __tablename__ = "store_deletion_jobs"
+
+    id = db.Column(db.String(36), primary_key=True)
+    store_id = db.Column(db.Integer, nullable=False, index=True)
+    status = db.Column(db.String(16), nullable=False, default="pending")
+    items_total = db.Column(db.Integer, nullable=False, default=0)
+    tags_total = db.Column(db.Integer, nullable=False, default=0)
+    items_moved = db.Column(db.Integer, nullable=False, default=0)
+    tags_moved = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False, default=_utcnow)
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False, default=_utcnow, onupdate=_utcnow)
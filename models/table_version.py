@@ -0,0 +1,24 @@
+from sqlalchemy import event
+
+from db import db
+
+
+# Tables whose list endpoints carry an ETag built from their change counter.
+TRACKED_TABLES = ("items", "stores", "tags")
+
+
+class TableVersionModel(db.Model):
+    """Change counter per table, bumped once by every transaction that writes it.
+
+    List ETags read these instead of aggregating the tables themselves.
+    """
+
+    __tablename__ = "table_versions"
+
+    name = db.Column(db.String(32), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0, server_default="0")
+
+
+@event.listens_for(TableVersionModel.__table__, "after_create")
+def _seed_table_versions(table, connection, **kwargs):
+    connection.execute(table.insert(), [{"name": name, "version": 0} for name in TRACKED_TABLES])
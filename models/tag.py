@@ -1,11 +1,12 @@
 from db import db
+from models.versioned import VersionedMixin
 
-class TagModel(db.Model):
+class TagModel(VersionedMixin, db.Model):
     __tablename__ = "tags"
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(88), unique=True, nullable=False)
-    store_id = db.Column(db.Integer, db.ForeignKey("stores.id"), nullable=False)
+    store_id = db.Column(db.Integer, db.ForeignKey("stores.id"), nullable=False, index=True)
 
     store = db.relationship("StoreModel", back_populates="tags")
     items = db.relationship("ItemModel", back_populates="tags", secondary="items_tags")
\ No newline at end of file
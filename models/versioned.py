@@ -0,0 +1,106 @@
+from sqlalchemy import event, inspect, update
+from sqlalchemy.orm import Session
+
+from db import db
+from models.table_version import TRACKED_TABLES, TableVersionModel
+
+
+class VersionedMixin:
+    """Row version bumped on every ORM write; backs the ETags on GET endpoints."""
+
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+
+
+def _store_ids(obj):
+    """Current and previous ``store_id`` of an item or tag being flushed."""
+    history = inspect(obj).attrs.store_id.history
+    return {
+        store_id
+        for store_id in (obj.store_id, *history.deleted)
+        if store_id is not None
+    }
+
+
+def bump_store_versions(session, store_ids):
+    """Bump ``stores.version`` for stores whose embedded items or tags changed."""
+    from models.store import StoreModel
+
+    mapper = inspect(StoreModel)
+    pending = set()
+    for store_id in store_ids:
+        store = session.identity_map.get(mapper.identity_key_from_primary_key([store_id]))
+        if store is None:
+            pending.add(store_id)
+        elif store not in session.deleted:
+            store.version = (store.version or 0) + 1
+
+    if pending:
+        session.execute(
+            update(StoreModel.__table__)
+            .where(StoreModel.__table__.c.id.in_(pending))
+            .values(version=StoreModel.__table__.c.version + 1)
+        )
+    if store_ids:
+        touch_tables(session, "stores")
+
+
+def touch_tables(session, *names):
+    """Record that this transaction wrote ``names``; their change counters are
+    bumped once, at commit. ORM flushes are recorded automatically, so only
+    Core statements run through the session need this."""
+    session.info.setdefault("touched_tables", set()).update(
+        name for name in names if name in TRACKED_TABLES
+    )
+
+
+def bump_table_versions(connection, names):
+    """Bump the change counters of ``names`` on ``connection``.
+
+    One row per statement, in name order, so concurrent writers lock the
+    counter rows in the same order.
+    """
+    table = TableVersionModel.__table__
+    for name in sorted(set(names) & set(TRACKED_TABLES)):
+        connection.execute(
+            update(table).where(table.c.name == name).values(version=table.c.version + 1)
+        )
+
+
+@event.listens_for(Session, "before_flush")
+def _bump_versions(session, flush_context, instances):
+    from models.store import StoreModel
+
+    stores = set()
+    bumped_stores = set()
+    for obj in session.dirty:
+        if isinstance(obj, VersionedMixin) and session.is_modified(obj):
+            obj.version = (obj.version or 0) + 1
+            touch_tables(session, obj.__tablename__)
+            if isinstance(obj, StoreModel):
+                bumped_stores.add(obj.id)
+            else:
+                stores |= _store_ids(obj)
+
+    for obj in (*session.new, *session.deleted):
+        if isinstance(obj, VersionedMixin):
+            touch_tables(session, obj.__tablename__)
+            if not isinstance(obj, StoreModel):
+                stores |= _store_ids(obj)
+
+    stores -= bumped_stores
+    if stores:
+        bump_store_versions(session, stores)
+
+
+@event.listens_for(Session, "before_commit")
+def _commit_table_versions(session):
+    # Commit flushes after this hook; flush first so its writes are counted.
+    session.flush()
+    names = session.info.pop("touched_tables", None)
+    if names:
+        bump_table_versions(session, names)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_table_versions(session):
+    session.info.pop("touched_tables", None)
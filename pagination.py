@@ -0,0 +1,69 @@
+import base64
+import binascii
+import json
+
+from flask import current_app
+from flask_smorest import abort
+
+
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 500
+
+
+def encode_cursor(last_id):
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        last_id = payload["id"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        abort(400, message="Invalid pagination cursor.")
+    if not isinstance(last_id, int):
+        abort(400, message="Invalid pagination cursor.")
+    return last_id
+
+
+def page_limit(requested):
+    default = current_app.config.get("PAGINATION_DEFAULT_LIMIT", DEFAULT_PAGE_LIMIT)
+    maximum = current_app.config.get("PAGINATION_MAX_LIMIT", MAX_PAGE_LIMIT)
+    return min(requested or default, maximum)
+
+
+def paginate(query, key_column, pagination_args):
+    """Keyset-paginate ``query`` on ``key_column`` (the primary key).
+
+    Returns ``(rows, headers)``; the opaque cursor for the next page and the
+    optional total are exposed through the ``X-Pagination`` header so the body
+    keeps the plain list shape of the schema.
+    """
+    limit, after, metadata = page_bounds(pagination_args)
+    if pagination_args.get("include_total"):
+        metadata["total"] = query.order_by(None).count()
+
+    if after is not None:
+        query = query.filter(key_column > after)
+
+    rows = query.order_by(key_column).limit(limit + 1).all()
+    return page_headers(rows, limit, key_column, metadata)
+
+
+def page_bounds(pagination_args):
+    """``(limit, after_id, metadata)`` for a keyset page; see ``paginate``."""
+    limit = page_limit(pagination_args.get("limit"))
+    after = pagination_args.get("after")
+    metadata = {"limit": limit, "next_cursor": None}
+    return limit, decode_cursor(after) if after else None, metadata
+
+
+def page_headers(rows, limit, key_column, metadata):
+    """Trim the look-ahead row from ``rows`` and build ``X-Pagination``."""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        metadata["next_cursor"] = encode_cursor(getattr(rows[-1], key_column.key))
+
+    headers = {"X-Pagination": json.dumps(metadata)}
+    return rows, headers
@@ -0,0 +1,135 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app
+from passlib.hash import pbkdf2_sha256
+
+from metrics import (
+    PASSWORD_HASH_DURATION_SECONDS,
+    PASSWORD_HASH_QUEUE_WAIT_SECONDS,
+    PASSWORD_HASH_REJECTED_TOTAL,
+    service_name,
+)
+
+
+DEFAULT_ROUNDS = pbkdf2_sha256.default_rounds
+
+
+class HashPoolSaturated(Exception):
+    """Raised when too many hashing jobs are already queued."""
+
+
+def _hash_password(password, rounds, submitted_at):
+    started = time.time()
+    hashed = pbkdf2_sha256.using(rounds=rounds).hash(password)
+    return hashed, started - submitted_at, time.time() - started
+
+
+def _verify_password(password, hashed, submitted_at):
+    started = time.time()
+    valid = pbkdf2_sha256.verify(password, hashed)
+    return valid, started - submitted_at, time.time() - started
+
+
+class PasswordHasher:
+    """Runs pbkdf2 off the request thread in a bounded process pool.
+
+    At most ``max_pending`` jobs may be queued or running; beyond that callers
+    get ``HashPoolSaturated`` so the endpoint can shed load instead of
+    stalling every other request on the worker. ``workers=0`` hashes inline.
+    """
+
+    def __init__(self, workers, max_pending, rounds=DEFAULT_ROUNDS):
+        self.workers = workers
+        self.rounds = rounds
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._executor_pid = None
+        self._executor_lock = threading.Lock()
+
+    def _pool(self):
+        # The pool belongs to the process that created it; a forked server
+        # worker builds its own on first use.
+        if self._executor is None or self._executor_pid != os.getpid():
+            with self._executor_lock:
+                if self._executor is None or self._executor_pid != os.getpid():
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                    self._executor_pid = os.getpid()
+        return self._executor
+
+    def _discard(self, pool):
+        with self._executor_lock:
+            if self._executor is pool:
+                self._executor = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, operation, fn, *args):
+        # A pool process that dies (OOM kill, segfault) breaks the whole
+        # executor; replace it once, and shed the request if that breaks too.
+        for _ in range(2):
+            pool = self._pool()
+            try:
+                return pool.submit(fn, *args, time.time()).result()
+            except BrokenProcessPool:
+                self._discard(pool)
+        PASSWORD_HASH_REJECTED_TOTAL.labels(service=service_name(), operation=operation).inc()
+        raise HashPoolSaturated()
+
+    def _run(self, operation, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            PASSWORD_HASH_REJECTED_TOTAL.labels(service=service_name(), operation=operation).inc()
+            raise HashPoolSaturated()
+        try:
+            if self.workers:
+                result, wait, duration = self._submit(operation, fn, *args)
+            else:
+                result, wait, duration = fn(*args, time.time())
+        finally:
+            self._slots.release()
+
+        PASSWORD_HASH_QUEUE_WAIT_SECONDS.labels(service=service_name(), operation=operation).observe(
+            max(wait, 0)
+        )
+        PASSWORD_HASH_DURATION_SECONDS.labels(service=service_name(), operation=operation).observe(
+            duration
+        )
+        return result
+
+    def hash(self, password):
+        return self._run("hash", _hash_password, password, self.rounds)
+
+    def verify(self, password, hashed):
+        return self._run("verify", _verify_password, password, hashed)
+
+    def needs_rehash(self, hashed):
+        return pbkdf2_sha256.using(rounds=self.rounds).needs_update(hashed)
+
+
+def init_password_hasher(app):
+    workers = int(os.getenv("PASSWORD_HASH_WORKERS", min(os.cpu_count() or 1, 4)))
+    app.config.setdefault("PASSWORD_HASH_WORKERS", workers)
+    app.config.setdefault(
+        "PASSWORD_HASH_MAX_PENDING",
+        int(os.getenv("PASSWORD_HASH_MAX_PENDING", max(workers, 1) * 4)),
+    )
+    app.config.setdefault(
+        "PASSWORD_HASH_ROUNDS", int(os.getenv("PASSWORD_HASH_ROUNDS", DEFAULT_ROUNDS))
+    )
+    app.config.setdefault("PASSWORD_HASH_RETRY_AFTER", os.getenv("PASSWORD_HASH_RETRY_AFTER", "1"))
+
+    app.extensions["password_hasher"] = PasswordHasher(
+        workers=app.config["PASSWORD_HASH_WORKERS"],
+        max_pending=app.config["PASSWORD_HASH_MAX_PENDING"],
+        rounds=app.config["PASSWORD_HASH_ROUNDS"],
+    )
+
+
+def password_hasher():
+    return current_app.extensions["password_hasher"]
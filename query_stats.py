@@ -0,0 +1,108 @@
+"""
+    Per-request database query accounting.
+
+    Cursor events add every statement's duration to the current request's
+    ``QueryStats``. The request hooks in ``app.py`` export the totals and,
+    when ``QUERY_REPEAT_THRESHOLD`` is set, flag requests that run the same
+    statement shape over and over (the usual N+1 signature).
+"""
+import logging
+import re
+import time
+from collections import Counter
+
+from flask import current_app, g, has_request_context
+from sqlalchemy import event
+
+
+logger = logging.getLogger("app.db")
+
+# ``IN (?, ?, ?)`` lists vary in length with the data; collapse them so the
+# same query over a different number of ids counts as one shape.
+_PLACEHOLDER_LIST = re.compile(r"\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*,)+\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*\)")
+
+
+class RepeatedQueryError(Exception):
+    """Raised when ``QUERY_REPEAT_ACTION`` is ``raise`` and a request repeats a query."""
+
+
+class QueryStats:
+    __slots__ = ("count", "duration", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        self.statements[_PLACEHOLDER_LIST.sub("(?)", statement)] += 1
+
+    def repeated(self, threshold):
+        """Statement shapes executed more than ``threshold`` times."""
+        return [
+            (statement, count)
+            for statement, count in self.statements.most_common()
+            if count > threshold
+        ]
+
+
+def instrument_queries(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        if has_request_context():
+            stats = g.get("query_stats")
+            if stats is not None:
+                stats.record(statement, time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        started = exception_context.connection and exception_context.connection.info.get(
+            "query_started"
+        )
+        if started:
+            started.pop()
+
+
+def start_query_stats():
+    g.query_stats = QueryStats()
+
+
+def current_query_stats():
+    return g.get("query_stats")
+
+
+def check_repeated_queries(stats, route):
+    """Warn about (or reject) a request that repeated a statement shape."""
+    threshold = current_app.config.get("QUERY_REPEAT_THRESHOLD", 0)
+    if not threshold or stats is None:
+        return
+
+    repeated = stats.repeated(threshold)
+    if not repeated:
+        return
+
+    if current_app.config.get("QUERY_REPEAT_ACTION") == "raise":
+        statement, count = repeated[0]
+        raise RepeatedQueryError(
+            f"{route} ran the same statement {count} times "
+            f"(threshold {threshold}): {statement}"
+        )
+    for statement, count in repeated:
+        logger.warning(
+            "Repeated query detected",
+            extra={
+                "event": "repeated_query",
+                "request_id": g.get("request_id"),
+                "route": route,
+                "count": count,
+                "threshold": threshold,
+                "statement": statement,
+            },
+        )
@@ -0,0 +1,319 @@
+"""
+    Read-replica routing.
+
+    Replicas are Flask-SQLAlchemy binds (``replica_0``, ``replica_1``, ...)
+    built from ``DB_REPLICA_URLS``. GET/HEAD requests to the API blueprints
+    pick a healthy replica and ``db.RoutingSession`` sends their plain SELECTs
+    to it; writes, locking reads and all other requests stay on the primary.
+    A successful write sets a short-lived cookie that keeps the client's reads
+    on the primary for ``DB_READ_YOUR_WRITES_SECONDS``. Clients that drop
+    cookies (most Bearer-token API clients) are covered for the common case
+    by ``load_or_retry_on_primary``: an entity GET that 404s on a replica is
+    retried on the primary.
+
+    Health and lag are re-checked every ``DB_REPLICA_CHECK_SECONDS`` by
+    whichever request gets there first, as the revocation cache does for its
+    sync. A replica that fails the check, or lags by more than
+    ``DB_REPLICA_MAX_LAG_SECONDS``, gets no reads until a later check passes.
+"""
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_app_context, request
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.exceptions import NotFound
+
+from db import db
+from db_pool import pool_options
+from metrics import (
+    DB_READ_ROUTING_TOTAL,
+    DB_REPLICA_HEALTHY,
+    DB_REPLICA_LAG_SECONDS,
+    service_name,
+)
+
+
+DEFAULT_MAX_LAG_SECONDS = 5.0
+DEFAULT_CHECK_SECONDS = 5.0
+DEFAULT_READ_YOUR_WRITES_SECONDS = 5
+DEFAULT_CONNECT_TIMEOUT = 2
+READ_METHODS = frozenset({"GET", "HEAD"})
+READ_YOUR_WRITES_COOKIE = "db_primary_until"
+
+logger = logging.getLogger("app.replicas")
+
+
+class ReplicaStatus:
+    def __init__(self, bind_key):
+        self.bind_key = bind_key
+        self.healthy = False
+        self.lag = None
+        self.error = "not checked yet"
+
+
+def _primary_lsn():
+    if db.engine.dialect.name != "postgresql":
+        return None
+    try:
+        with db.engine.connect() as connection:
+            return connection.execute(text("SELECT CAST(pg_current_wal_lsn() AS text)")).scalar_one()
+    except SQLAlchemyError:
+        # Without the primary's position lag falls back to replay age.
+        return None
+
+
+def replica_lag(connection, primary_lsn=None):
+    """Seconds ``connection``'s server is behind the primary.
+
+    A server that is not in recovery (e.g. a second standalone instance used
+    for local testing) and non-Postgres databases count as caught up. A
+    streaming replica that has replayed up to ``primary_lsn`` is caught up;
+    otherwise the lag is the age of its last replayed transaction.
+    """
+    if connection.dialect.name != "postgresql":
+        connection.execute(text("SELECT 1"))
+        return 0.0
+    in_recovery, bytes_behind, replay_age = connection.execute(
+        text(
+            "SELECT pg_is_in_recovery(), "
+            "pg_wal_lsn_diff(CAST(:primary_lsn AS pg_lsn), pg_last_wal_replay_lsn()), "
+            "EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())"
+        ),
+        {"primary_lsn": primary_lsn},
+    ).one()
+    if not in_recovery:
+        return 0.0
+    if bytes_behind is not None and bytes_behind <= 0:
+        return 0.0
+    if replay_age is None:
+        return float("inf")
+    return max(float(replay_age), 0.0)
+
+
+class ReplicaRouter:
+    def __init__(
+        self,
+        bind_keys,
+        max_lag=DEFAULT_MAX_LAG_SECONDS,
+        check_interval=DEFAULT_CHECK_SECONDS,
+    ):
+        self.replicas = [ReplicaStatus(bind_key) for bind_key in bind_keys]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._healthy = ()
+        self._turn = itertools.count()
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def choose(self):
+        """Bind key of a healthy replica (round robin), or ``None``."""
+        self._maybe_check()
+        healthy = self._healthy
+        if not healthy:
+            return None
+        return healthy[next(self._turn) % len(healthy)]
+
+    def _maybe_check(self):
+        if time.monotonic() < self._next_check:
+            return
+        # One request runs the check; the others keep the current rotation
+        # (which is empty, i.e. primary only, until the first check is done).
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            if time.monotonic() >= self._next_check:
+                self.check()
+        finally:
+            self._lock.release()
+
+    def check(self):
+        primary_lsn = _primary_lsn()
+        for replica in self.replicas:
+            was_healthy = replica.healthy
+            try:
+                with db.engines[replica.bind_key].connect() as connection:
+                    lag = replica_lag(connection, primary_lsn)
+            except SQLAlchemyError as error:
+                replica.healthy = False
+                replica.lag = None
+                replica.error = str(error).splitlines()[0]
+            else:
+                replica.lag = lag
+                replica.healthy = lag <= self.max_lag
+                replica.error = (
+                    None
+                    if replica.healthy
+                    else f"lag {lag:.1f}s exceeds {self.max_lag:g}s"
+                )
+
+            DB_REPLICA_HEALTHY.labels(service=service_name(), engine=replica.bind_key).set(
+                1 if replica.healthy else 0
+            )
+            if replica.lag is not None and replica.lag != float("inf"):
+                DB_REPLICA_LAG_SECONDS.labels(
+                    service=service_name(), engine=replica.bind_key
+                ).set(replica.lag)
+            if replica.healthy != was_healthy:
+                logger.log(
+                    logging.INFO if replica.healthy else logging.WARNING,
+                    "Replica %s %s rotation",
+                    replica.bind_key,
+                    "back in" if replica.healthy else "taken out of",
+                    extra={
+                        "event": "replica_health",
+                        "engine": replica.bind_key,
+                        "healthy": replica.healthy,
+                        "lag_seconds": replica.lag,
+                        "error": replica.error,
+                    },
+                )
+
+        self._healthy = tuple(replica.bind_key for replica in self.replicas if replica.healthy)
+        self._next_check = time.monotonic() + self.check_interval
+
+
+def _routed(engine, reason):
+    DB_READ_ROUTING_TOTAL.labels(service=service_name(), engine=engine, reason=reason).inc()
+
+
+def _in_read_your_writes_window():
+    until = request.cookies.get(READ_YOUR_WRITES_COOKIE)
+    try:
+        return until is not None and float(until) > time.time()
+    except ValueError:
+        return False
+
+
+def init_replicas(app):
+    """Register replica binds and the routing hooks; call before ``db.init_app``."""
+    app.config.setdefault("DB_REPLICA_URLS", os.getenv("DB_REPLICA_URLS", ""))
+    app.config.setdefault(
+        "DB_REPLICA_MAX_LAG_SECONDS",
+        float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", DEFAULT_MAX_LAG_SECONDS)),
+    )
+    app.config.setdefault(
+        "DB_REPLICA_CHECK_SECONDS",
+        float(os.getenv("DB_REPLICA_CHECK_SECONDS", DEFAULT_CHECK_SECONDS)),
+    )
+    app.config.setdefault(
+        "DB_REPLICA_CONNECT_TIMEOUT",
+        int(os.getenv("DB_REPLICA_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT)),
+    )
+    app.config.setdefault(
+        "DB_READ_YOUR_WRITES_SECONDS",
+        int(os.getenv("DB_READ_YOUR_WRITES_SECONDS", DEFAULT_READ_YOUR_WRITES_SECONDS)),
+    )
+
+    urls = [url.strip() for url in app.config["DB_REPLICA_URLS"].split(",") if url.strip()]
+    app.extensions["replicas"] = None
+    if not urls:
+        return
+
+    binds = app.config.setdefault("SQLALCHEMY_BINDS", {})
+    for index, url in enumerate(urls):
+        options = {"url": url, **pool_options(app, url)}
+        if url.startswith("postgresql"):
+            # A replica that is down must not hold a request for the OS
+            # connect timeout; the check just marks it unhealthy.
+            options["connect_args"] = {"connect_timeout": app.config["DB_REPLICA_CONNECT_TIMEOUT"]}
+        binds[f"replica_{index}"] = options
+
+    router = ReplicaRouter(
+        [f"replica_{index}" for index in range(len(urls))],
+        max_lag=app.config["DB_REPLICA_MAX_LAG_SECONDS"],
+        check_interval=app.config["DB_REPLICA_CHECK_SECONDS"],
+    )
+    app.extensions["replicas"] = router
+    window = app.config["DB_READ_YOUR_WRITES_SECONDS"]
+
+    @app.before_request
+    def route_reads():
+        # Only API reads; /readyz and friends must keep checking the primary.
+        if request.method not in READ_METHODS or request.blueprint is None:
+            return
+        if _in_read_your_writes_window():
+            _routed("primary", "read_your_writes")
+            return
+        bind_key = router.choose()
+        if bind_key is None:
+            _routed("primary", "no_healthy_replica")
+            return
+        g.db_read_bind = bind_key
+        _routed(bind_key, "replica")
+
+    @app.after_request
+    def start_read_your_writes_window(response):
+        if (
+            window > 0
+            and request.method not in READ_METHODS
+            and request.blueprint is not None
+            and response.status_code < 400
+        ):
+            response.set_cookie(
+                READ_YOUR_WRITES_COOKIE,
+                str(int(time.time()) + window),
+                max_age=window,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+
+def check_replicas(app):
+    """Run a replica check now (startup warm-up), if replicas are configured."""
+    router = app.extensions.get("replicas")
+    if router is not None:
+        router.check()
+
+
+def replica_status(app):
+    router = app.extensions.get("replicas")
+    if router is None:
+        return []
+    return [
+        {
+            "engine": replica.bind_key,
+            "healthy": replica.healthy,
+            "lag_seconds": replica.lag,
+            "error": replica.error,
+        }
+        for replica in router.replicas
+    ]
+
+
+def read_engine():
+    """Engine for reads that bypass the session (raw connections, COPY)."""
+    read_bind = g.get("db_read_bind") if has_app_context() else None
+    return db.engines[read_bind] if read_bind is not None else db.engine
+
+
+def load_or_retry_on_primary(load):
+    """Run ``load``; if it 404s on a replica, run it again on the primary.
+
+    A row created moments ago may not have been replayed yet, and the client
+    that created it may not have sent the read-your-writes cookie.
+    """
+    try:
+        return load()
+    except NotFound:
+        if g.get("db_read_bind") is None:
+            raise
+    _routed("primary", "replica_miss")
+    with primary_reads():
+        return load()
+
+
+@contextmanager
+def primary_reads():
+    """Send this block's reads to the primary, even in a routed GET."""
+    previous = g.pop("db_read_bind", None)
+    try:
+        yield
+    finally:
+        if previous is not None:
+            g.db_read_bind = previous
@@ -0,0 +1,186 @@
+import csv
+import io
+import json
+import queue
+import threading
+
+from flask import Response, current_app, stream_with_context
+from flask.views import MethodView
+from flask_smorest import Blueprint
+from sqlalchemy import select
+
+from db import db
+from replicas import read_engine
+from models import ItemModel, StoreModel, TagModel
+from schemas import ExportArgsSchema
+
+blp = Blueprint("Export", "export", description="Streaming catalog exports")
+
+EXPORT_CHUNK_SIZE = 1000
+COPY_BUFFER_BYTES = 64 * 1024
+COPY_QUEUE_SIZE = 16
+
+EXPORTS = {
+    "items": (ItemModel.__table__, ("id", "name", "price", "store_id")),
+    "stores": (StoreModel.__table__, ("id", "name")),
+    "tags": (TagModel.__table__, ("id", "name", "store_id")),
+}
+
+MIMETYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _statement(table, columns):
+    return select(*(table.c[name] for name in columns)).order_by(table.c.id)
+
+
+def _partitions(table, columns):
+    chunk_size = current_app.config.get("EXPORT_CHUNK_SIZE", EXPORT_CHUNK_SIZE)
+    result = db.session.execute(
+        _statement(table, columns).execution_options(yield_per=chunk_size)
+    )
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+        db.session.rollback()
+
+
+def _ndjson_rows(table, columns):
+    for partition in _partitions(table, columns):
+        yield "".join(
+            json.dumps(dict(zip(columns, row))) + "\n" for row in partition
+        )
+
+
+def _csv_rows(table, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for partition in _partitions(table, columns):
+        writer.writerows(partition)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+class _CopyCancelled(Exception):
+    pass
+
+
+class _QueueWriter:
+    """File-like sink for ``copy_expert`` that hands buffered chunks to a queue."""
+
+    def __init__(self, chunks, cancelled):
+        self.chunks = chunks
+        self.cancelled = cancelled
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data if isinstance(data, bytes) else data.encode()
+        if len(self.buffer) >= COPY_BUFFER_BYTES:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.put(bytes(self.buffer))
+            self.buffer.clear()
+
+    def put(self, chunk):
+        while not self.cancelled.is_set():
+            try:
+                self.chunks.put(chunk, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+        raise _CopyCancelled()
+
+
+def _copy_csv_rows(table, columns):
+    """Stream ``COPY ... TO STDOUT`` output from a worker thread."""
+    sql = "COPY ({}) TO STDOUT WITH (FORMAT csv, HEADER true)".format(
+        _statement(table, columns).compile(
+            dialect=db.engine.dialect, compile_kwargs={"literal_binds": True}
+        )
+    )
+    chunks = queue.Queue(maxsize=COPY_QUEUE_SIZE)
+    cancelled = threading.Event()
+    done = object()
+    connection = read_engine().raw_connection()
+
+    def run():
+        writer = _QueueWriter(chunks, cancelled)
+        try:
+            with connection.cursor() as cursor:
+                cursor.copy_expert(sql, writer)
+            writer.flush()
+            writer.put(done)
+        except _CopyCancelled:
+            pass
+        except Exception as error:
+            try:
+                writer.put(error)
+            except _CopyCancelled:
+                pass
+        finally:
+            connection.close()
+
+    worker = threading.Thread(target=run, name=f"export-copy-{table.name}", daemon=True)
+    worker.start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is done:
+                return
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        cancelled.set()
+
+
+def export_response(entity, export_format):
+    table, columns = EXPORTS[entity]
+    if export_format == "ndjson":
+        rows = _ndjson_rows(table, columns)
+    elif db.engine.dialect.name == "postgresql":
+        rows = _copy_csv_rows(table, columns)
+    else:
+        rows = _csv_rows(table, columns)
+
+    extension = "ndjson" if export_format == "ndjson" else "csv"
+    return Response(
+        stream_with_context(rows),
+        mimetype=MIMETYPES[export_format],
+        headers={
+            "Content-Disposition": f"attachment; filename={entity}.{extension}"
+        },
+    )
+
+
+@blp.route("/export/items")
+class ItemExport(MethodView):
+    @blp.arguments(ExportArgsSchema, location="query")
+    @blp.alt_response(200, description="Items as NDJSON or CSV, streamed")
+    def get(self, export_args):
+        return export_response("items", export_args["format"])
+
+
+@blp.route("/export/stores")
+class StoreExport(MethodView):
+    @blp.arguments(ExportArgsSchema, location="query")
+    @blp.alt_response(200, description="Stores as NDJSON or CSV, streamed")
+    def get(self, export_args):
+        return export_response("stores", export_args["format"])
+
+
+@blp.route("/export/tags")
+class TagExport(MethodView):
+    @blp.arguments(ExportArgsSchema, location="query")
+    @blp.alt_response(200, description="Tags as NDJSON or CSV, streamed")
+    def get(self, export_args):
+        return export_response("tags", export_args["format"])
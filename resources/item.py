@@ -1,13 +1,30 @@
+import json
 import uuid
+from collections import Counter
+from flask import current_app, request
 from flask.views import MethodView
 from flask_smorest import Blueprint, abort
+from marshmallow import ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import  SQLAlchemyError
 from flask_jwt_extended import jwt_required, get_jwt
 
-from schemas import ItemSchema, ItemUpdateSchema
-from models import ItemModel, StoreModel
+from schemas import FieldSelectionArgsSchema, ItemSchema, ItemUpdateSchema, PaginationArgsSchema
+from models import ItemModel, StoreModel, adjust_store_counts, bump_store_versions, touch_tables
 from db import db
-from metrics import ITEMS_CREATED_TOTAL, service_name
+from metrics import (
+    ITEMS_BULK_REJECTED_TOTAL,
+    ITEMS_BULK_UPSERTED_TOTAL,
+    ITEMS_CREATED_TOTAL,
+    service_name,
+)
+from fieldsets import select_schema
+from pagination import paginate
+from loading import schema_query
+from cache import cached_response, entity_key, invalidate
+from etags import is_not_modified, item_etag, list_etag, not_modified_response
+from serialization import json_response
 
 blp = Blueprint("Items", "items", description="Operations on items")
 
@@ -16,8 +33,13 @@ blp = Blueprint("Items", "items", description="Operations on items")
 class Item(MethodView):
     @blp.response(200, ItemSchema)
     def get(self, item_id):
-        item = ItemModel.query.get_or_404(item_id)
-        return item
+        return cached_response(
+            "item",
+            item_id,
+            ItemSchema(),
+            lambda: schema_query(ItemModel, ItemSchema).get_or_404(item_id),
+            item_etag,
+        )
     
     @jwt_required(fresh=True)
     def delete(self, item_id):
@@ -26,8 +48,10 @@ class Item(MethodView):
             abort(401, message="Admin privilege is required.")
 
         item = ItemModel.query.get_or_404(item_id)
+        store_id = item.store_id
         db.session.delete(item)
         db.session.commit()
+        invalidate(entity_key("item", item_id), entity_key("store", store_id))
 
         return {"Message": "Item deleted"}
 
@@ -48,15 +72,24 @@ class Item(MethodView):
 
         db.session.add(item)
         db.session.commit()
+        invalidate(entity_key("item", item.id), entity_key("store", item.store_id))
 
         return item
 
 
 @blp.route("/item")
 class ItemList(MethodView):
+    @blp.arguments(PaginationArgsSchema, location="query")
+    @blp.arguments(FieldSelectionArgsSchema, location="query")
     @blp.response(200, ItemSchema(many=True))
-    def get(self):
-        return ItemModel.query.all()
+    def get(self, pagination_args, selection_args):
+        schema = select_schema(ItemSchema, selection_args)
+        etag = list_etag("item", schema)
+        if is_not_modified(etag):
+            return not_modified_response(etag)
+        items, headers = paginate(schema_query(ItemModel, schema), ItemModel.id, pagination_args)
+        headers["ETag"] = f'"{etag}"'
+        return json_response(schema, items, many=True, headers=headers)
 
     @jwt_required()
     @blp.arguments(ItemSchema)
@@ -73,5 +106,147 @@ class ItemList(MethodView):
         except SQLAlchemyError:
             abort(500, "An Error happened while inserting the item.")
         
+        invalidate(entity_key("store", item.store_id))
         ITEMS_CREATED_TOTAL.labels(service=service_name()).inc()
         return item
+
+
+BULK_CHUNK_SIZE = 1000
+
+UPSERT_DIALECTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def _bulk_payload():
+    """Rows from a JSON array or an NDJSON body, as ``(index, row_or_error)``."""
+    if request.mimetype == "application/x-ndjson":
+        lines = request.get_data(as_text=True).splitlines()
+        for index, line in enumerate(lines):
+            if not line.strip():
+                continue
+            try:
+                yield index, json.loads(line)
+            except ValueError:
+                yield index, ValidationError("Invalid JSON.")
+        return
+
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, list):
+        abort(400, message="Expected a JSON array or an application/x-ndjson body.")
+    yield from enumerate(payload)
+
+
+def _upsert_statement(rows):
+    insert = UPSERT_DIALECTS.get(db.engine.dialect.name)
+    if insert is None:
+        abort(501, message="Bulk upsert is not supported on this database.")
+
+    statement = insert(ItemModel.__table__).values(rows)
+    return statement.on_conflict_do_update(
+        index_elements=[ItemModel.__table__.c.name],
+        set_={
+            "price": statement.excluded.price,
+            "store_id": statement.excluded.store_id,
+            "version": ItemModel.__table__.c.version + 1,
+        },
+    )
+
+
+def _item_count_deltas(rows, existing):
+    """Per-store ``item_count`` changes caused by upserting ``rows``."""
+    deltas = Counter()
+    for row in rows:
+        previous = existing.get(row["name"])
+        if previous is not None:
+            deltas[previous[1]] -= 1
+        deltas[row["store_id"]] += 1
+    return deltas
+
+
+def _upsert_chunk(chunk, errors):
+    """Upsert ``chunk`` in one statement, isolating failing rows on error."""
+    # ON CONFLICT cannot touch the same row twice in one statement, so the
+    # last occurrence of a name within the chunk wins.
+    latest = {row["name"]: (index, row) for index, row in chunk}
+    rows = [row for _, row in latest.values()]
+
+    # Rows updated in place may move between stores, so both the old and
+    # the new parent store entries are stale afterwards.
+    existing = {
+        name: (item_id, store_id)
+        for item_id, name, store_id in db.session.execute(
+            select(ItemModel.id, ItemModel.name, ItemModel.store_id).where(
+                ItemModel.name.in_(latest)
+            )
+        )
+    }
+    touched_stores = {store_id for _, store_id in existing.values()}
+    touched_stores |= {row["store_id"] for row in rows}
+    stale_keys = [entity_key("item", item_id) for item_id, _ in existing.values()]
+    stale_keys += [entity_key("store", store_id) for store_id in touched_stores]
+
+    try:
+        db.session.execute(_upsert_statement(rows))
+        touch_tables(db.session, "items")
+        bump_store_versions(db.session, touched_stores)
+        adjust_store_counts(db.session, _item_count_deltas(rows, existing))
+        db.session.commit()
+        invalidate(*stale_keys)
+        return len(rows)
+    except SQLAlchemyError:
+        db.session.rollback()
+
+    upserted = []
+    for index, row in latest.values():
+        try:
+            with db.session.begin_nested():
+                db.session.execute(_upsert_statement([row]))
+            upserted.append(row)
+        except SQLAlchemyError as error:
+            errors.append({"index": index, "errors": {"_db": [str(error.orig or error)]}})
+    touch_tables(db.session, "items")
+    bump_store_versions(db.session, touched_stores)
+    adjust_store_counts(db.session, _item_count_deltas(upserted, existing))
+    db.session.commit()
+    invalidate(*stale_keys)
+    return len(upserted)
+
+
+@blp.route("/item/bulk")
+class ItemBulk(MethodView):
+    @jwt_required()
+    @blp.response(200)
+    def post(self):
+        """Insert or update many items by name in chunked transactions."""
+        jwt = get_jwt()
+        if not jwt.get("is_admin"):
+            abort(401, message="Admin privilege is required.")
+
+        schema = ItemSchema()
+        chunk_size = current_app.config.get("BULK_CHUNK_SIZE", BULK_CHUNK_SIZE)
+        errors = []
+        chunk = []
+        upserted = 0
+
+        for index, row in _bulk_payload():
+            try:
+                if isinstance(row, ValidationError):
+                    raise row
+                chunk.append((index, schema.load(row)))
+            except ValidationError as error:
+                errors.append({"index": index, "errors": error.normalized_messages()})
+                continue
+
+            if len(chunk) >= chunk_size:
+                upserted += _upsert_chunk(chunk, errors)
+                chunk = []
+
+        if chunk:
+            upserted += _upsert_chunk(chunk, errors)
+
+        ITEMS_BULK_UPSERTED_TOTAL.labels(service=service_name()).inc(upserted)
+        ITEMS_BULK_REJECTED_TOTAL.labels(service=service_name()).inc(len(errors))
+        errors.sort(key=lambda error: error["index"])
+        return {"upserted": upserted, "rejected": len(errors), "errors": errors}
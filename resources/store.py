@@ -1,12 +1,21 @@
+import json
 import uuid
-from flask import request
+from flask import current_app, request, url_for
 from flask.views import MethodView
 from flask_smorest import Blueprint, abort
+from sqlalchemy import case, func, select
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from flask_jwt_extended import jwt_required
 
-from schemas import StoreSchema, ItemSchema
-from models import StoreModel, ItemModel
+from schemas import (
+    FieldSelectionArgsSchema,
+    ItemSchema,
+    PaginationArgsSchema,
+    StoreDeletionJobSchema,
+    StoreSchema,
+    StoreSearchArgsSchema,
+)
+from models import StoreModel, ItemModel, TagModel, StoreDeletionJobModel
 from db import db
 from metrics import (
     STORE_ITEM_LINK_TOTAL,
@@ -15,34 +24,77 @@ from metrics import (
     STORES_CREATED_TOTAL,
     service_name,
 )
+from fieldsets import select_schema
+from pagination import page_limit, paginate
+from loading import schema_query
+from store_deletion import (
+    UNASSIGNED_STORE_ID,
+    active_job,
+    delete_store,
+    is_abandoned,
+    resume_deletion_job,
+    start_deletion_job,
+)
+from cache import cached_response, entity_key, invalidate
+from etags import is_not_modified, list_etag, not_modified_response, store_etag
+from serialization import json_response
 
 
 blp = Blueprint("Stores", "stores", description="Operations on stores")
 
 
+def _store_keys(store_id):
+    """Cache keys embedding this store: the store itself plus its items and tags."""
+    item_ids = db.session.execute(
+        select(ItemModel.id).where(ItemModel.store_id == store_id)
+    ).scalars()
+    tag_ids = db.session.execute(
+        select(TagModel.id).where(TagModel.store_id == store_id)
+    ).scalars()
+    return (
+        [entity_key("store", store_id)]
+        + [entity_key("item", item_id) for item_id in item_ids]
+        + [entity_key("tag", tag_id) for tag_id in tag_ids]
+    )
+
+
 @blp.route("/store/<string:store_id>")
 class Store(MethodView):
     @blp.response(200, StoreSchema)
     def get(cls, store_id):
-        store = StoreModel.query.get_or_404(store_id)
-        return store
+        return cached_response(
+            "store",
+            store_id,
+            StoreSchema(),
+            lambda: schema_query(StoreModel, StoreSchema).get_or_404(store_id),
+            store_etag,
+        )
     
     jwt_required()
+    @blp.response(200)
+    @blp.alt_response(202, description="Large store; deletion continues in the background")
     def delete(self, store_id):
         store = StoreModel.query.get_or_404(store_id)
+        if store.id == UNASSIGNED_STORE_ID:
+            abort(400, message="The Unassigned store can't be deleted.")
 
-        UNASSIGNED_ID = 0 
-        for item in list(store.items):
-            item.store_id = UNASSIGNED_ID
-            
-        for tag in list(store.tags):
-            tag.store_id = UNASSIGNED_ID
+        job = active_job(store.id)
+        if job is not None and is_abandoned(job):
+            job = resume_deletion_job(job)
+        elif job is None and (
+            store.item_count + store.tag_count
+            > current_app.config["STORE_DELETE_ASYNC_THRESHOLD"]
+        ):
+            job = start_deletion_job(store)
 
-        
-        db.session.flush() 
-        db.session.delete(store)
-        db.session.commit()
+        if job is not None:
+            return {
+                "message": "Store deletion accepted; items/tags are being moved to Unassigned store.",
+                "job": StoreDeletionJobSchema().dump(job),
+                "status_url": url_for("Stores.StoreDeletionJobStatus", job_id=job.id),
+            }, 202
 
+        delete_store(store.id, current_app.config["STORE_DELETE_CHUNK_SIZE"])
         return {"message": "Store deleted, and associated items/tags moved to Unassigned store."}
 
     jwt_required()
@@ -54,6 +106,7 @@ class Store(MethodView):
         if store:
             store.name = store_data.get("name", store.name)
             db.session.commit()
+            invalidate(*_store_keys(store.id))
         else:
             store = StoreModel(id=store_id, **store_data)
             db.session.commit()
@@ -62,9 +115,17 @@ class Store(MethodView):
     
 @blp.route("/store")
 class StoreList(MethodView):
+    @blp.arguments(PaginationArgsSchema, location="query")
+    @blp.arguments(FieldSelectionArgsSchema, location="query")
     @blp.response(200, StoreSchema(many=True))
-    def get(cls):
-        return StoreModel.query.all()
+    def get(cls, pagination_args, selection_args):
+        schema = select_schema(StoreSchema, selection_args)
+        etag = list_etag("store", schema)
+        if is_not_modified(etag):
+            return not_modified_response(etag)
+        stores, headers = paginate(schema_query(StoreModel, schema), StoreModel.id, pagination_args)
+        headers["ETag"] = f'"{etag}"'
+        return json_response(schema, stores, many=True, headers=headers)
 
     jwt_required()
     @blp.arguments(StoreSchema)
@@ -89,20 +150,72 @@ class StoreList(MethodView):
 
 @blp.route("/store/search")
 class StoreSearch(MethodView):
+    @blp.arguments(StoreSearchArgsSchema, location="query")
+    @blp.arguments(FieldSelectionArgsSchema, location="query")
     @blp.response(200, StoreSchema(many=True))
-    def get(self):
-        name = request.args.get("name")
+    def get(self, search_args, selection_args):
+        name = search_args.get("name")
         if not name:
             abort(400, message="Provide ?name=<term>")
         STORE_SEARCH_TOTAL.labels(service=service_name()).inc()
-        return StoreModel.query.filter(StoreModel.name.ilike(f"%{name}%")).all()
-    
+
+        limit = page_limit(search_args.get("limit"))
+        offset = search_args["offset"]
+        schema = select_schema(StoreSchema, selection_args)
+        query = search_stores(schema_query(StoreModel, schema), name, db.engine.dialect.name)
+        stores = query.offset(offset).limit(limit + 1).all()
+        stores, headers = search_page(stores, limit, offset)
+        return json_response(schema, stores, many=True, headers=headers)
+
+
+def search_stores(query, name, dialect_name):
+    """Filter ``query`` (a Query or a select) to stores matching ``name``, best first."""
+    pattern = "%{}%".format(
+        name.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    )
+    query = query.filter(StoreModel.name.ilike(pattern, escape="\\"))
+
+    if dialect_name == "postgresql":
+        # ILIKE '%term%' is served by the pg_trgm GIN index on stores.name.
+        rank = (func.similarity(StoreModel.name, name).desc(),)
+    else:
+        rank = (
+            case(
+                (func.lower(StoreModel.name) == name.lower(), 0),
+                (StoreModel.name.ilike(pattern[1:], escape="\\"), 1),
+                else_=2,
+            ),
+            func.length(StoreModel.name),
+        )
+    return query.order_by(*rank, StoreModel.id)
+
+
+def search_page(stores, limit, offset):
+    """Trim the look-ahead row and build the offset ``X-Pagination`` header."""
+    next_offset = offset + limit if len(stores) > limit else None
+    headers = {
+        "X-Pagination": json.dumps(
+            {"limit": limit, "offset": offset, "next_offset": next_offset}
+        )
+    }
+    return stores[:limit], headers
+
+@blp.route("/store/delete-jobs/<string:job_id>")
+class StoreDeletionJobStatus(MethodView):
+    @blp.response(200, StoreDeletionJobSchema)
+    def get(self, job_id):
+        return StoreDeletionJobModel.query.get_or_404(job_id)
+
+
 @blp.route("/store/<int:store_id>/count")
 class StoreItemCount(MethodView):
     @blp.response(200)
     def get(self, store_id):
-        count = ItemModel.query.filter_by(store_id=store_id).count()
-        return {"store_id": store_id, "item_count": count}
+        counts = db.session.execute(
+            select(StoreModel.item_count, StoreModel.tag_count).where(StoreModel.id == store_id)
+        ).first()
+        item_count, tag_count = counts or (0, 0)
+        return {"store_id": store_id, "item_count": item_count, "tag_count": tag_count}
     
 @blp.route("/store/<int:store_id>/item/<int:item_id>")
 class StoreItem(MethodView):
@@ -121,6 +234,11 @@ class StoreItem(MethodView):
         UNASSIGNED_ID = 0
         item.store_id = UNASSIGNED_ID
         db.session.commit()
+        invalidate(
+            entity_key("item", item.id),
+            entity_key("store", store_id),
+            entity_key("store", UNASSIGNED_ID),
+        )
         STORE_ITEM_UNLINK_TOTAL.labels(service=service_name()).inc()
 
         return {"message": "Item moved to Unassigned store", "item": ItemSchema().dump(item)}
@@ -136,8 +254,14 @@ class StoreItem(MethodView):
         if item.store_id == store_id:
             return {"message": "Item already assigned to this store", "item": ItemSchema().dump(item)}
         
+        previous_store_id = item.store_id
         item.store_id = store_id
         db.session.commit()
+        invalidate(
+            entity_key("item", item.id),
+            entity_key("store", previous_store_id),
+            entity_key("store", store_id),
+        )
         STORE_ITEM_LINK_TOTAL.labels(service=service_name()).inc()
 
         return {"message": "Item linked to store", "item": ItemSchema().dump(item)}
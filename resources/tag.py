@@ -5,22 +5,31 @@ from flask_jwt_extended import jwt_required
 
 from db import db
 from models import TagModel, StoreModel, ItemModel
-from schemas import TagSchema, TagAndItemSchema
+from schemas import FieldSelectionArgsSchema, TagSchema, TagAndItemSchema, PaginationArgsSchema
 from metrics import (
     ITEM_TAG_LINK_TOTAL,
     ITEM_TAG_UNLINK_TOTAL,
     TAGS_CREATED_TOTAL,
     service_name,
 )
+from fieldsets import select_schema
+from pagination import paginate
+from loading import schema_query
+from cache import cached_response, entity_key, invalidate
+from etags import is_not_modified, list_etag, not_modified_response, tag_etag
+from serialization import json_response
 
 blp = Blueprint("Tags", "tags", description="Operations on tags")
 
 @blp.route("/store/<string:store_id>/tag")
 class TagsInStore(MethodView):
+    @blp.arguments(FieldSelectionArgsSchema, location="query")
     @blp.response(200, TagSchema(many=True))
-    def get(self, store_id):
-        store = StoreModel.query.get_or_404(store_id)
-        return store.tags.all()
+    def get(self, selection_args, store_id):
+        StoreModel.query.get_or_404(store_id)
+        schema = select_schema(TagSchema, selection_args)
+        tags = schema_query(TagModel, schema).filter(TagModel.store_id == store_id).all()
+        return json_response(schema, tags, many=True)
     
     jwt_required()
     @blp.arguments(TagSchema)
@@ -38,6 +47,7 @@ class TagsInStore(MethodView):
                 500,
                 message=str(e)
                 )
+        invalidate(entity_key("store", store_id))
         TAGS_CREATED_TOTAL.labels(service=service_name()).inc()
         return tag
     
@@ -49,13 +59,15 @@ class LinkTagsToItem(MethodView):
         item = ItemModel.query.get_or_404(item_id)
         tag = TagModel.query.get_or_404(tag_id)
 
-        item.tags.append(tag)
+        if tag not in item.tags:
+            item.tags.append(tag)
 
         try:
             db.session.add(item)
             db.session.commit()
         except SQLAlchemyError:
             abort(500, message="An error occurred while inserting the tag.")
+        invalidate(entity_key("item", item.id))
 
         ITEM_TAG_LINK_TOTAL.labels(service=service_name()).inc()
         return tag
@@ -73,6 +85,7 @@ class LinkTagsToItem(MethodView):
             db.session.commit()
         except SQLAlchemyError:
             abort(500, message="An error occurred while inserting the tag.")
+        invalidate(entity_key("item", item.id))
 
         ITEM_TAG_UNLINK_TOTAL.labels(service=service_name()).inc()
         return {"message": "Item removed from tag", "item": item, "tag": tag}
@@ -80,16 +93,29 @@ class LinkTagsToItem(MethodView):
 
 @blp.route("/tag")
 class TagList(MethodView):
+    @blp.arguments(PaginationArgsSchema, location="query")
+    @blp.arguments(FieldSelectionArgsSchema, location="query")
     @blp.response(200, TagSchema(many=True))
-    def get(self):
-        return TagModel.query.all()
+    def get(self, pagination_args, selection_args):
+        schema = select_schema(TagSchema, selection_args)
+        etag = list_etag("tag", schema)
+        if is_not_modified(etag):
+            return not_modified_response(etag)
+        tags, headers = paginate(schema_query(TagModel, schema), TagModel.id, pagination_args)
+        headers["ETag"] = f'"{etag}"'
+        return json_response(schema, tags, many=True, headers=headers)
  
 @blp.route("/tag/<string:tag_id>")
 class Tag(MethodView):
     @blp.response(200, TagSchema)
     def get(self, tag_id):
-        tag = TagModel.query.get_or_404(tag_id)
-        return tag
+        return cached_response(
+            "tag",
+            tag_id,
+            TagSchema(),
+            lambda: schema_query(TagModel, TagSchema).get_or_404(tag_id),
+            tag_etag,
+        )
 
     jwt_required()
     @blp.response(202, description="Deletes a tag if no item is tagged with it")
@@ -99,8 +125,10 @@ class Tag(MethodView):
         tag = TagModel.query.get_or_404(tag_id)
         
         if not tag.items:
+            store_id = tag.store_id
             db.session.delete(tag)
             db.session.commit()
+            invalidate(entity_key("tag", tag_id), entity_key("store", store_id))
             return {"message": "Tag deleted."}
         
         abort(
@@ -1,12 +1,13 @@
+from flask import current_app
 from flask.views import MethodView
 from flask_smorest import Blueprint, abort
-from passlib.hash import pbkdf2_sha256
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt, create_refresh_token, get_jwt_identity
 
 from db import db
 from models import UserModel
 from schemas import UserSchema
-from blocklist import BLOCKLIST
+from blocklist import revoke_token
+from passwords import HashPoolSaturated, password_hasher
 from metrics import (
     LOGOUT_TOTAL,
     TOKEN_REFRESH_TOTAL,
@@ -17,6 +18,15 @@ from metrics import (
 
 blp = Blueprint("Users", "users", description="operations on users")
 
+
+def abort_saturated():
+    abort(
+        503,
+        message="Too many concurrent authentication requests, retry shortly.",
+        headers={"Retry-After": str(current_app.config["PASSWORD_HASH_RETRY_AFTER"])},
+    )
+
+
 @blp.route("/register")
 class UserRegister(MethodView):
     @blp.arguments(UserSchema)
@@ -24,9 +34,14 @@ class UserRegister(MethodView):
         if UserModel.query.filter(UserModel.username == user_data["username"]).first():
             abort(409, message="A user with that username already exists.")
 
+        try:
+            hashed = password_hasher().hash(user_data["password"])
+        except HashPoolSaturated:
+            abort_saturated()
+
         user = UserModel(
             username = user_data["username"],
-            password = pbkdf2_sha256.hash(user_data["password"])
+            password = hashed
         )
 
         db.session.add(user)
@@ -44,7 +59,21 @@ class UserLogin(MethodView):
             UserModel.username == user_data["username"]
         ).first()
 
-        if user and pbkdf2_sha256.verify(user_data["password"], user.password):
+        hasher = password_hasher()
+        try:
+            valid = user is not None and hasher.verify(user_data["password"], user.password)
+        except HashPoolSaturated:
+            abort_saturated()
+
+        if valid:
+            if hasher.needs_rehash(user.password):
+                # Upgrade hashes transparently when the configured rounds change;
+                # skipped under load since the current hash is still valid.
+                try:
+                    user.password = hasher.hash(user_data["password"])
+                    db.session.commit()
+                except HashPoolSaturated:
+                    pass
             access_token = create_access_token(identity=str(user.id), fresh=True)
             refresh_token = create_refresh_token(identity=str(user.id))
             USER_LOGIN_TOTAL.labels(service=service_name()).inc()
@@ -58,17 +87,15 @@ class TokenRefresh(MethodView):
     def post(self):
         current_user = get_jwt_identity()
         new_token = create_access_token(identity=current_user, fresh=False)
-        jti = get_jwt()["jti"]
-        BLOCKLIST.add(jti)
+        revoke_token(get_jwt())
         TOKEN_REFRESH_TOTAL.labels(service=service_name()).inc()
         return {"access_token": new_token}
 
 @blp.route("/logout")
 class UserLogout(MethodView):
-    @jwt_required
+    @jwt_required()
     def post(self):
-        jti = get_jwt()["jti"]
-        BLOCKLIST.add(jti)
+        revoke_token(get_jwt())
         LOGOUT_TOTAL.labels(service=service_name()).inc()
         return {"message": "Successfully logged out."}
 
@@ -1,4 +1,4 @@
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, validate
 
 
 class PlainItemSchema(Schema):
@@ -44,4 +44,45 @@ class TagAndItemSchema(Schema):
 class UserSchema(Schema):
     id = fields.Int(dump_only=True)
     username = fields.Str(required=True)
-    password = fields.Str(required=True, load_only=True)
\ No newline at end of file
+    password = fields.Str(required=True, load_only=True)
+
+
+class PaginationArgsSchema(Schema):
+    limit = fields.Int(validate=validate.Range(min=1))
+    after = fields.Str()
+    include_total = fields.Bool(load_default=False)
+
+
+class FieldSelectionArgsSchema(Schema):
+    embed = fields.Str(
+        metadata={"description": "Comma-separated nested objects to include; empty for none"}
+    )
+    # Declared last: the attribute shadows the ``fields`` module in this body.
+    fields = fields.Str(
+        metadata={"description": "Comma-separated fields to return, e.g. id,name,tags.name"}
+    )
+
+
+class StoreSearchArgsSchema(Schema):
+    name = fields.Str()
+    limit = fields.Int(validate=validate.Range(min=1))
+    offset = fields.Int(load_default=0, validate=validate.Range(min=0))
+
+
+class StoreDeletionJobSchema(Schema):
+    id = fields.Str(dump_only=True)
+    store_id = fields.Int(dump_only=True)
+    status = fields.Str(dump_only=True)
+    items_total = fields.Int(dump_only=True)
+    tags_total = fields.Int(dump_only=True)
+    items_moved = fields.Int(dump_only=True)
+    tags_moved = fields.Int(dump_only=True)
+    error = fields.Str(dump_only=True)
+    created_at = fields.DateTime(dump_only=True)
+    updated_at = fields.DateTime(dump_only=True)
+
+
+class ExportArgsSchema(Schema):
+    format = fields.Str(
+        load_default="ndjson", validate=validate.OneOf(["ndjson", "csv"])
+    )
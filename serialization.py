@@ -0,0 +1,169 @@
+"""
+    Compiled dump functions for the response schemas.
+
+    ``Schema.dump`` resolves every field through ``Field.serialize`` and the
+    schema's accessor for every object. For the plain Int/Float/Str/Nested/List
+    fields our schemas use, ``dumper()`` generates one straight-line function
+    per schema instead, producing the same dicts (and therefore the same JSON
+    bytes). Fields it does not recognise fall back to ``Field.serialize``, and
+    schemas with dump hooks are not compiled at all.
+"""
+from flask import current_app
+from marshmallow import Schema, fields, missing
+from marshmallow.utils import ensure_text_type
+
+
+# Exact classes only: subclasses may override ``_serialize``.
+_CONVERSIONS = {
+    fields.Integer: "int",
+    fields.Float: "float",
+    fields.String: "str",
+}
+
+
+def schema_key(schema):
+    """Hashable description of everything that shapes ``schema``'s output.
+
+    Dotted ``only``/``exclude`` entries end up on the nested fields' schemas,
+    so those are part of the key too.
+    """
+    nested = tuple(
+        (name, schema_key(nested_schema))
+        for name, field in schema.dump_fields.items()
+        for nested_schema in [_nested_schema(field)]
+        if nested_schema is not None
+    )
+    only = frozenset(schema.only) if schema.only is not None else None
+    return type(schema), only, frozenset(schema.exclude), frozenset(schema.load_only), nested
+
+
+def _field_is_plain(field, name):
+    return (
+        (field.attribute or name).isidentifier()
+        and field.data_key is None
+        and field.dump_default is missing
+        and "." not in (field.attribute or "")
+        and type(field).get_value is fields.Field.get_value
+    )
+
+
+def _compile(schema):
+    if (
+        any(schema._hooks[hook] for hook in ("pre_dump", "post_dump"))
+        or type(schema).get_attribute is not Schema.get_attribute
+    ):
+        return schema.dump
+
+    namespace = {"missing": missing, "schema": schema, "ensure_text_type": ensure_text_type}
+    lines = ["def dump(obj):", "    data = {}"]
+    for index, (name, field) in enumerate(schema.dump_fields.items()):
+        attribute = field.attribute or name
+        plain = _field_is_plain(field, name)
+        conversion = _CONVERSIONS.get(type(field)) if plain else None
+        value = f"v{index}"
+
+        if conversion is not None and not getattr(field, "as_string", False):
+            lines.append(f"    {value} = obj.{attribute}")
+            if conversion == "str":
+                expression = (
+                    f"{value} if {value} is None or type({value}) is str "
+                    f"else ensure_text_type({value})"
+                )
+            else:
+                expression = f"None if {value} is None else {conversion}({value})"
+            lines.append(f"    data[{name!r}] = {expression}")
+            continue
+
+        nested = _nested_field(field)
+        if nested is not None and plain:
+            nested_schema, many = nested
+            namespace[f"dump{index}"] = dumper(nested_schema)
+            lines.append(f"    {value} = obj.{attribute}")
+            if many:
+                expression = f"None if {value} is None else [dump{index}(each) for each in {value}]"
+            else:
+                expression = f"None if {value} is None else dump{index}({value})"
+            lines.append(f"    data[{name!r}] = {expression}")
+            continue
+
+        # Anything else goes through marshmallow for this one field.
+        namespace[f"field{index}"] = field
+        key = field.data_key if field.data_key is not None else name
+        lines.append(
+            f"    {value} = field{index}.serialize({name!r}, obj, accessor=schema.get_attribute)"
+        )
+        lines.append(f"    if {value} is not missing:")
+        lines.append(f"        data[{key!r}] = {value}")
+    lines.append("    return data")
+
+    exec("\n".join(lines), namespace)
+    compiled = namespace["dump"]
+
+    def dump(obj):
+        try:
+            return compiled(obj)
+        except AttributeError:
+            # Objects lacking an attribute get marshmallow's "skip missing"
+            # behaviour.
+            return schema.dump(obj)
+
+    return dump
+
+
+def _nested_schema(field):
+    if type(field) is fields.List and type(field.inner) is fields.Nested:
+        return field.inner.schema
+    if type(field) is fields.Nested:
+        return field.schema
+    return None
+
+
+def _nested_field(field):
+    """``(schema, many)`` for a plain Nested or List(Nested) field."""
+    if type(field) is fields.List and type(field.inner) is fields.Nested:
+        inner = field.inner
+        if inner.data_key is not None or type(inner).get_value is not fields.Field.get_value:
+            return None
+        return inner.schema, True
+    if type(field) is fields.Nested:
+        return field.schema, bool(field.many or field.schema.many)
+    return None
+
+
+_dumpers = {}
+_class_dumpers = {}
+
+
+def dumper(schema):
+    """Function dumping one object exactly like ``schema.dump(obj)``.
+
+    Accepts a schema class or instance; instances with the same options share
+    one compiled function.
+    """
+    if isinstance(schema, type):
+        compiled = _class_dumpers.get(schema)
+        if compiled is None:
+            compiled = _class_dumpers[schema] = dumper(schema())
+        return compiled
+
+    key = schema_key(schema)
+    compiled = _dumpers.get(key)
+    if compiled is None:
+        compiled = _dumpers[key] = _compile(schema)
+    return compiled
+
+
+def dump(schema, obj, many=False):
+    dump_one = dumper(schema)
+    if many:
+        return [dump_one(each) for each in obj]
+    return dump_one(obj)
+
+
+def json_response(schema, obj, many=False, status=200, headers=None):
+    """JSON response for ``obj`` as flask-smorest would build it from ``schema``."""
+    response = current_app.json.response(dump(schema, obj, many=many))
+    response.status_code = status
+    if headers:
+        response.headers.update(headers)
+    return response
@@ -0,0 +1,169 @@
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import delete, select, update
+
+from cache import entity_key, invalidate
+from db import db
+from models import (
+    ItemModel,
+    StoreDeletionJobModel,
+    StoreModel,
+    TagModel,
+    adjust_store_counts,
+    bump_store_versions,
+    touch_tables,
+)
+
+
+UNASSIGNED_STORE_ID = 0
+ACTIVE_JOB_STATUSES = ("pending", "running")
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="store-delete")
+logger = logging.getLogger("app.store_deletion")
+
+
+def _move_chunk(model, store_id, chunk_size):
+    """Move up to ``chunk_size`` rows of ``model`` to the Unassigned store.
+
+    Returns the selected ids and how many of them this call actually moved;
+    a second worker on the same store finds the rows already gone.
+    """
+    table = model.__table__
+    ids = db.session.execute(
+        select(table.c.id)
+        .where(table.c.store_id == store_id)
+        .order_by(table.c.id)
+        .limit(chunk_size)
+    ).scalars().all()
+    if not ids:
+        return ids, 0
+
+    result = db.session.execute(
+        update(table)
+        .where(table.c.id.in_(ids), table.c.store_id == store_id)
+        .values(store_id=UNASSIGNED_STORE_ID, version=table.c.version + 1)
+    )
+    touch_tables(db.session, table.name)
+    return ids, result.rowcount
+
+
+def delete_store(store_id, chunk_size, job=None):
+    """Reassign a store's items and tags in bounded chunks, then delete it.
+
+    Each chunk is its own transaction, so locks are held only briefly and a
+    failed run can be resumed by deleting the store again.
+    """
+    for model, kind, counter in (
+        (ItemModel, "item", "items_moved"),
+        (TagModel, "tag", "tags_moved"),
+    ):
+        while True:
+            ids, count = _move_chunk(model, store_id, chunk_size)
+            if not ids:
+                break
+
+            moved = {store_id: -count, UNASSIGNED_STORE_ID: count}
+            if model is ItemModel:
+                adjust_store_counts(db.session, item_deltas=moved)
+            else:
+                adjust_store_counts(db.session, tag_deltas=moved)
+            bump_store_versions(db.session, {UNASSIGNED_STORE_ID})
+            if job is not None:
+                setattr(job, counter, getattr(job, counter) + count)
+            db.session.commit()
+            invalidate(*(entity_key(kind, row_id) for row_id in ids))
+
+    db.session.execute(delete(StoreModel.__table__).where(StoreModel.__table__.c.id == store_id))
+    touch_tables(db.session, "stores")
+    db.session.commit()
+    invalidate(entity_key("store", store_id), entity_key("store", UNASSIGNED_STORE_ID))
+
+
+def active_job(store_id):
+    return StoreDeletionJobModel.query.filter(
+        StoreDeletionJobModel.store_id == store_id,
+        StoreDeletionJobModel.status.in_(ACTIVE_JOB_STATUSES),
+    ).first()
+
+
+def is_abandoned(job):
+    """True when an active job has made no progress for
+    ``STORE_DELETE_JOB_STALE_SECONDS``, e.g. because its worker died."""
+    updated_at = job.updated_at
+    if updated_at.tzinfo is None:  # SQLite drops the offset
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    stale_after = timedelta(seconds=current_app.config["STORE_DELETE_JOB_STALE_SECONDS"])
+    return datetime.now(timezone.utc) - updated_at > stale_after
+
+
+def resume_deletion_job(job):
+    """Hand an abandoned job to a new background worker.
+
+    The claim only succeeds if ``updated_at`` is unchanged, so concurrent
+    retries of the same delete resume the job once.
+    """
+    table = StoreDeletionJobModel.__table__
+    claimed = db.session.execute(
+        update(table)
+        .where(
+            table.c.id == job.id,
+            table.c.status.in_(ACTIVE_JOB_STATUSES),
+            table.c.updated_at == job.updated_at,
+        )
+        .values(status="pending", updated_at=datetime.now(timezone.utc))
+    ).rowcount
+    db.session.commit()
+    if claimed:
+        logger.warning(
+            "Resuming abandoned store deletion job",
+            extra={"event": "store_deletion_resumed", "job_id": job.id, "store_id": job.store_id},
+        )
+        _submit(job.id)
+    return job
+
+
+def start_deletion_job(store):
+    """Record a deletion job for ``store`` and run it on a background thread."""
+    job = StoreDeletionJobModel(
+        id=str(uuid.uuid4()),
+        store_id=store.id,
+        status="pending",
+        items_total=store.item_count,
+        tags_total=store.tag_count,
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    _submit(job.id)
+    return job
+
+
+def _submit(job_id):
+    app = current_app._get_current_object()
+    _executor.submit(_run_job, app, job_id, current_app.config["STORE_DELETE_CHUNK_SIZE"])
+
+
+def _run_job(app, job_id, chunk_size):
+    with app.app_context():
+        job = db.session.get(StoreDeletionJobModel, job_id)
+        if job is None or job.status not in ACTIVE_JOB_STATUSES:
+            return
+        job.status = "running"
+        db.session.commit()
+        try:
+            delete_store(job.store_id, chunk_size, job=job)
+        except Exception as error:
+            db.session.rollback()
+            logger.exception(
+                "Store deletion job failed",
+                extra={"event": "store_deletion_failed", "job_id": job_id, "store_id": job.store_id},
+            )
+            job.status = "failed"
+            job.error = str(error)
+        else:
+            job.status = "completed"
+        db.session.commit()
@@ -0,0 +1,34 @@
+import os
+
+import pytest
+from flask_migrate import upgrade
+from sqlalchemy import text
+
+os.environ.setdefault("WARMUP_SCHEMA_CHECK", "off")
+
+from app import create_app  # noqa: E402
+from db import db  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    """App on a schema built by the migrations.
+
+    Runs against a throwaway SQLite file unless ``TEST_DATABASE_URL`` points
+    at a scratch Postgres database, which is emptied again afterwards.
+    """
+    app = create_app(os.getenv("TEST_DATABASE_URL") or f"sqlite:///{tmp_path / 'test.db'}")
+    app.config["TESTING"] = True
+    with app.app_context():
+        upgrade()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all(bind_key=None)
+        with db.engine.begin() as conn:
+            conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,54 @@
+from catalog_import import import_catalog
+from db import db
+from models import ItemModel, StoreModel, TagModel
+
+CATALOG = {
+    "stores": "name\ns1\ns2\n",
+    "tags": "name,store\nt1,s1\nt2,s2\n",
+    "items": "name,price,store\ni1,1.50,s1\ni2,2.50,s1\ni3,3.50,s2\n",
+    "links": "item,tag\ni1,t1\ni3,t2\n",
+}
+
+
+def write_catalog(tmp_path, **overrides):
+    sources = {}
+    for entity, content in {**CATALOG, **overrides}.items():
+        path = tmp_path / f"{entity}.csv"
+        path.write_text(content)
+        sources[entity] = str(path)
+    return sources
+
+
+def run_import(app, sources):
+    with app.app_context():
+        stats = {result.entity: result for result in import_catalog(sources, echo=lambda line: None)}
+        versions = {
+            model.__tablename__: dict(db.session.execute(db.select(model.name, model.version)).all())
+            for model in (StoreModel, ItemModel, TagModel)
+        }
+        db.session.remove()
+    return stats, versions
+
+
+def test_reimport_changes_nothing(app, tmp_path):
+    sources = write_catalog(tmp_path)
+    _, first = run_import(app, sources)
+    stats, second = run_import(app, sources)
+
+    assert second == first
+    assert all(result.merged == 0 for result in stats.values())
+
+
+def test_only_stores_owning_changed_rows_are_bumped(app, tmp_path):
+    _, before = run_import(app, write_catalog(tmp_path))
+    stats, after = run_import(app, write_catalog(
+        tmp_path,
+        # i1 changes price in s1; i3 moves from s2 to s1.
+        items="name,price,store\ni1,9.99,s1\ni2,2.50,s1\ni3,3.50,s1\n",
+    ))
+
+    assert stats["items"].merged == 2
+    assert after["items"]["i2"] == before["items"]["i2"]
+    assert after["stores"]["s1"] == before["stores"]["s1"] + 1
+    assert after["stores"]["s2"] == before["stores"]["s2"] + 1
+    assert after["tags"] == before["tags"]
@@ -0,0 +1,129 @@
+import fakeredis
+import pytest
+
+import cache
+from cache import LRUCacheBackend, RedisCacheBackend, entity_key
+from db import db
+from models import ItemModel, StoreModel, TagModel
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request):
+    if request.param == "memory":
+        return LRUCacheBackend(max_entries=3, ttl=60)
+    return RedisCacheBackend(fakeredis.FakeRedis(), ttl=60)
+
+
+def test_get_set_delete(backend):
+    assert backend.get("item:1") is None
+
+    backend.set("item:1", b"one")
+    backend.set("item:2", b"two")
+    assert backend.get("item:1") == b"one"
+
+    backend.delete("item:1", "item:404")
+    assert backend.get("item:1") is None
+    assert backend.get("item:2") == b"two"
+
+
+def test_delete_prefix_only_drops_that_kind(backend):
+    backend.set("item:1", b"one")
+    backend.set("item:2", b"two")
+    backend.set("store:1", b"store")
+
+    assert backend.delete_prefix(entity_key("item", "")) == 2
+    assert backend.get("item:1") is None
+    assert backend.get("item:2") is None
+    assert backend.get("store:1") == b"store"
+
+
+def test_lru_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    backend = LRUCacheBackend(ttl=60)
+
+    backend.set("item:1", b"one")
+    now[0] += 59
+    assert backend.get("item:1") == b"one"
+    now[0] += 1
+    assert backend.get("item:1") is None
+
+
+def test_lru_evicts_least_recently_used():
+    backend = LRUCacheBackend(max_entries=2, ttl=60)
+    backend.set("item:1", b"one")
+    backend.set("item:2", b"two")
+    backend.get("item:1")
+    backend.set("item:3", b"three")
+
+    assert backend.get("item:2") is None
+    assert backend.get("item:1") == b"one"
+    assert backend.get("item:3") == b"three"
+
+
+def test_redis_sets_ttl_and_namespaces_keys():
+    client = fakeredis.FakeRedis()
+    backend = RedisCacheBackend(client, ttl=30, prefix="test:")
+
+    backend.set("item:1", b"one")
+
+    assert client.get("test:item:1") == b"one"
+    assert 0 < client.ttl("test:item:1") <= 30
+
+
+@pytest.fixture
+def cached_app(app):
+    app.extensions["entity_cache"] = LRUCacheBackend()
+    with app.app_context():
+        store = StoreModel(name="store")
+        tag = TagModel(name="tag", store=store)
+        item = ItemModel(name="item", price=1.0, store=store)
+        db.session.add_all([store, tag, item])
+        db.session.commit()
+        app.ids = {"store": store.id, "tag": tag.id, "item": item.id}
+    return app
+
+
+def cached_get(app, client, kind):
+    entity_id = app.ids[kind]
+    with client.get(f"/{kind}/{entity_id}") as response:
+        assert response.status_code == 200
+    assert app.extensions["entity_cache"].get(entity_key(kind, entity_id)) is not None
+    with client.get(f"/{kind}/{entity_id}") as response:
+        return response.get_json()
+
+
+def test_item_tag_link_invalidates_item(cached_app, client):
+    ids = cached_app.ids
+    assert cached_get(cached_app, client, "item")["tags"] == []
+
+    with client.post(f"/item/{ids['item']}/tag/{ids['tag']}") as response:
+        assert response.status_code == 201
+
+    assert cached_app.extensions["entity_cache"].get(entity_key("item", ids["item"])) is None
+    with client.get(f"/item/{ids['item']}") as response:
+        assert [tag["name"] for tag in response.get_json()["tags"]] == ["tag"]
+
+
+def test_store_rename_invalidates_store(cached_app, client):
+    store_id = cached_app.ids["store"]
+    assert cached_get(cached_app, client, "store")["name"] == "store"
+
+    with client.put(f"/store/{store_id}", json={"name": "renamed"}) as response:
+        assert response.status_code == 200
+
+    assert cached_app.extensions["entity_cache"].get(entity_key("store", store_id)) is None
+    with client.get(f"/store/{store_id}") as response:
+        assert response.get_json()["name"] == "renamed"
+
+
+def test_tag_delete_invalidates_tag(cached_app, client):
+    tag_id = cached_app.ids["tag"]
+    assert cached_get(cached_app, client, "tag")["name"] == "tag"
+
+    with client.delete(f"/tag/{tag_id}") as response:
+        assert response.status_code == 202
+
+    assert cached_app.extensions["entity_cache"].get(entity_key("tag", tag_id)) is None
+    with client.get(f"/tag/{tag_id}") as response:
+        assert response.status_code == 404
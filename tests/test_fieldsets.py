@@ -0,0 +1,89 @@
+import re
+
+import pytest
+from flask import g
+
+from db import db
+from models import ItemModel, StoreModel, TagModel
+
+
+@pytest.fixture
+def statements(app):
+    """SQL statements run by the test's requests, in order."""
+    recorded = []
+
+    @app.after_request
+    def record(response):
+        recorded.extend(g.query_stats.statements.elements())
+        return response
+
+    return recorded
+
+
+@pytest.fixture
+def seeded(app):
+    with app.app_context():
+        store = StoreModel(name="store")
+        tags = [TagModel(name="red", store=store), TagModel(name="blue", store=store)]
+        db.session.add(ItemModel(name="chair", price=10.0, store=store, tags=tags))
+        db.session.commit()
+
+
+def get_items(client, query):
+    response = client.get(f"/item?{query}")
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def test_fields_limits_keys(client, seeded):
+    assert get_items(client, "fields=id,name") == [{"id": 1, "name": "chair"}]
+
+
+def test_dotted_fields_reach_into_nested_objects(client, seeded):
+    [item] = get_items(client, "fields=name,tags.name,store.name")
+    assert item == {
+        "name": "chair",
+        "store": {"name": "store"},
+        "tags": [{"name": "red"}, {"name": "blue"}],
+    }
+
+
+def test_empty_embed_drops_nested_objects(client, seeded):
+    assert get_items(client, "embed=") == [{"id": 1, "name": "chair", "price": 10.0}]
+
+
+def test_embed_adds_nested_objects(client, seeded):
+    [item] = get_items(client, "embed=store")
+    assert item == {"id": 1, "name": "chair", "price": 10.0, "store": {"id": 1, "name": "store"}}
+
+
+@pytest.mark.parametrize(
+    "query, message",
+    [
+        ("fields=nope", "Unknown fields: nope."),
+        ("fields=tags.nope", "Unknown fields: tags.nope."),
+        ("fields=id,store.name.x,tags.nope", "Unknown fields: store.name.x, tags.nope."),
+        ("fields=name.x", "Unknown fields: name.x."),
+        ("embed=name", "Cannot embed: name."),
+        ("fields=", "Select at least one field."),
+    ],
+)
+def test_bad_selection_is_rejected_before_any_query(client, statements, query, message):
+    response = client.get(f"/item?{query}")
+
+    assert response.status_code == 400
+    assert response.get_json()["message"] == message
+    assert statements == []
+
+
+def test_column_selection_runs_one_narrow_select(client, seeded, statements):
+    get_items(client, "fields=id,name,price")
+
+    item_queries = [sql for sql in statements if re.search(r"\bFROM items\b", sql)]
+    assert len(item_queries) == 1
+    columns = re.match(r"SELECT (.*?)\s+FROM items\b", item_queries[0], re.S).group(1)
+    assert [column.split(" AS ")[0].strip() for column in columns.split(",")] == [
+        "items.id",
+        "items.name",
+        "items.price",
+    ]
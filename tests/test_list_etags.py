@@ -0,0 +1,78 @@
+from flask import g
+
+from db import db
+from models import ItemModel, StoreModel, TagModel
+from store_deletion import UNASSIGNED_STORE_ID, delete_store
+
+
+def list_etag(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    return response.headers["ETag"]
+
+
+def seed(app):
+    with app.app_context():
+        db.session.add(StoreModel(id=UNASSIGNED_STORE_ID, name="Unassigned"))
+        store = StoreModel(name="store")
+        tag = TagModel(name="tag", store=store)
+        db.session.add(ItemModel(name="item", price=1.0, store=store, tags=[tag]))
+        db.session.commit()
+        return store.id
+
+
+def test_list_etag_reads_counters_not_tables(app, client):
+    seed(app)
+    statements = []
+
+    @app.after_request
+    def record(response):
+        statements.extend(g.query_stats.statements)
+        return response
+
+    etag = list_etag(client, "/item?fields=id,name,price")
+
+    fingerprint = [sql for sql in statements if "table_versions" in sql]
+    assert len(fingerprint) == 1
+    assert not any("count(" in sql.lower() or "sum(" in sql.lower() for sql in statements)
+    assert client.get(
+        "/item?fields=id,name,price", headers={"If-None-Match": etag}
+    ).status_code == 304
+
+
+def test_list_etag_follows_writes_to_listed_tables(app, client):
+    store_id = seed(app)
+    items = list_etag(client, "/item")
+    item_columns = list_etag(client, "/item?fields=id,name,price")
+    stores = list_etag(client, "/store")
+
+    with app.app_context():
+        db.session.get(StoreModel, store_id).name = "renamed"
+        db.session.commit()
+
+    # The store is embedded in the default item list, not in the sparse one.
+    assert list_etag(client, "/item") != items
+    assert list_etag(client, "/item?fields=id,name,price") == item_columns
+    assert list_etag(client, "/store") != stores
+
+    with app.app_context():
+        db.session.execute(ItemModel.__table__.update().values(price=2.0))
+        db.session.rollback()
+    assert list_etag(client, "/item?fields=id,name,price") == item_columns
+
+    with app.app_context():
+        db.session.get(ItemModel, 1).price = 3.0
+        db.session.commit()
+    assert list_etag(client, "/item?fields=id,name,price") != item_columns
+
+
+def test_core_write_paths_bump_counters(app, client):
+    store_id = seed(app)
+    stores = list_etag(client, "/store?fields=id,name")
+    items = list_etag(client, "/item?fields=id,name,price")
+
+    with app.app_context():
+        delete_store(store_id, chunk_size=10)
+
+    assert list_etag(client, "/store?fields=id,name") != stores
+    assert list_etag(client, "/item?fields=id,name,price") != items
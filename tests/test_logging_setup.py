@@ -0,0 +1,37 @@
+import sys
+import threading
+import time
+
+from logging_setup import JsonFormatter
+
+
+def expected(created):
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(created)) + ".%03dZ" % (
+        (created - int(created)) * 1000
+    )
+
+
+def test_timestamps_stay_consistent_across_threads():
+    formatter = JsonFormatter()
+    mismatches = []
+    # Switch threads as often as possible so updates of the cached second
+    # interleave with reads of it.
+    previous = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+    def format_alternating(offset):
+        for n in range(20000):
+            created = 1_700_000_000 + (n + offset) % 7 + 0.25
+            if formatter._timestamp(created) != expected(created):
+                mismatches.append(created)
+
+    threads = [threading.Thread(target=format_alternating, args=(offset,)) for offset in range(8)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(previous)
+
+    assert mismatches == []
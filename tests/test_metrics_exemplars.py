@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+import textwrap
+import time
+
+# prometheus_client picks its multiprocess value backend at import time, so
+# the "worker" runs in a fresh interpreter with PROMETHEUS_MULTIPROC_DIR set.
+WORKER = textwrap.dedent(
+    """
+    from app import create_app
+    from db import db
+    from metrics import render_metrics
+
+    app = create_app("sqlite://")
+    with app.app_context():
+        db.create_all(bind_key=None)
+    client = app.test_client()
+    for _ in range(3):
+        with client.get("/store") as response:
+            assert response.status_code == 200
+    body, content_type = render_metrics("application/openmetrics-text")
+    print(body.decode())
+    """
+)
+
+
+def test_multiprocess_scrape_carries_request_id_exemplars(tmp_path):
+    env = dict(
+        os.environ,
+        PROMETHEUS_MULTIPROC_DIR=str(tmp_path),
+        WARMUP_SCHEMA_CHECK="off",
+        LOG_LEVEL="WARNING",
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", WORKER], env=env, capture_output=True, text=True, check=True
+    )
+
+    buckets = [
+        line
+        for line in result.stdout.splitlines()
+        if line.startswith("http_request_duration_seconds_bucket") and 'route="/store"' in line
+    ]
+    assert buckets
+    assert any(' # {request_id="' in line for line in buckets)
+    assert list(tmp_path.glob("exemplars_*.json"))
+
+
+def test_exemplars_are_written_off_the_request_thread(tmp_path, monkeypatch):
+    import metrics
+
+    monkeypatch.setattr(metrics, "EXEMPLAR_FLUSH_SECONDS", 0.05)
+    exemplars = metrics.MultiProcessExemplars(str(tmp_path))
+    keys = exemplars.bucket_keys("http_request_duration_seconds", {"route": "/item"}, (0.1, 1.0))
+
+    exemplars.record(keys, 0.5, {"request_id": "abc"})
+    assert not list(tmp_path.glob("exemplars_*.json"))
+
+    deadline = time.monotonic() + 5
+    while not list(tmp_path.glob("exemplars_*.json")) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    [exemplar] = metrics.MultiProcessExemplars.load(str(tmp_path)).values()
+    assert exemplar.labels == {"request_id": "abc"}
+    assert exemplar.value == 0.5
@@ -0,0 +1,33 @@
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+
+import pytest
+
+from passwords import HashPoolSaturated, PasswordHasher
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(workers=1, max_pending=4, rounds=1000)
+    yield hasher
+    if hasher._executor is not None:
+        hasher._executor.shutdown()
+
+
+def test_dead_pool_process_is_replaced(hasher):
+    hashed = hasher.hash("secret")
+    broken = hasher._executor
+    for process in list(broken._processes.values()):
+        process.kill()
+        process.join()
+
+    assert hasher.verify("secret", hashed)
+    assert hasher._executor is not broken
+
+
+def test_pool_that_keeps_breaking_sheds_the_request(hasher):
+    with mock.patch.object(PasswordHasher, "_pool") as pool:
+        pool.return_value.submit.side_effect = BrokenProcessPool("worker died")
+        with pytest.raises(HashPoolSaturated):
+            hasher.hash("secret")
+    assert pool.call_count == 2
@@ -0,0 +1,72 @@
+"""Per-request query counts must not grow with the data (no N+1 loads)."""
+import itertools
+
+import pytest
+from flask import g
+
+from db import db
+from models import ItemModel, StoreModel, TagModel
+
+N = 10
+ROUTES = (
+    "/item",
+    "/store",
+    "/tag",
+    "/item/{item_id}",
+    "/store/{store_id}",
+    "/tag/{tag_id}",
+    "/store/{store_id}/tag",
+)
+
+_names = itertools.count()
+
+
+def seed(store, count):
+    """Add ``count`` stores with a tagged item each, and ``count`` more tagged
+    items and tags to ``store``."""
+    for _ in range(count):
+        other = StoreModel(name=f"store-{next(_names)}")
+        tag = TagModel(name=f"tag-{next(_names)}", store=other)
+        db.session.add(ItemModel(name=f"item-{next(_names)}", price=1.5, store=other, tags=[tag]))
+
+        tag = TagModel(name=f"tag-{next(_names)}", store=store)
+        db.session.add(ItemModel(name=f"item-{next(_names)}", price=2.5, store=store, tags=[tag]))
+    db.session.commit()
+
+
+@pytest.fixture
+def query_counts(app):
+    counts = []
+
+    @app.after_request
+    def record(response):
+        counts.append(g.query_stats.count)
+        return response
+
+    return counts
+
+
+def measure(client, query_counts, ids):
+    measured = {}
+    for route in ROUTES:
+        response = client.get(route.format(**ids))
+        assert response.status_code == 200, route
+        measured[route] = query_counts[-1]
+    return measured
+
+
+def test_query_counts_do_not_grow_with_rows(app, client, query_counts):
+    with app.app_context():
+        store = StoreModel(name="hot-store")
+        db.session.add(store)
+        db.session.commit()
+        seed(store, N)
+        item = store.items[0]
+        ids = {"store_id": store.id, "item_id": item.id, "tag_id": item.tags[0].id}
+
+    small = measure(client, query_counts, ids)
+
+    with app.app_context():
+        seed(db.session.get(StoreModel, ids["store_id"]), 2 * N)
+
+    assert measure(client, query_counts, ids) == small
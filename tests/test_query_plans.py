@@ -0,0 +1,58 @@
+"""EXPLAIN the hot lookups and fail when one falls back to a sequential scan.
+
+On SQLite a full table walk shows up as ``SCAN <table>`` in
+``EXPLAIN QUERY PLAN``; on Postgres sequential scans are disabled for the
+statement so the planner only picks one when no usable index exists.
+"""
+import re
+
+import pytest
+from sqlalchemy import delete, select
+
+from db import db
+from models import ItemModel, TagModel
+from models.item_tags import ItemTags
+from models.store_counts import store_counts_update
+
+items = ItemModel.__table__
+tags = TagModel.__table__
+items_tags = ItemTags.__table__
+
+HOT_QUERIES = {
+    # stores.item_count/tag_count reconciliation (flask reconcile-store-counts, import-catalog)
+    "store counts": store_counts_update(),
+    # store_deletion._move_chunk, one chunk per table
+    "store delete items chunk": select(items.c.id).where(items.c.store_id == 1).order_by(items.c.id).limit(1000),
+    "store delete tags chunk": select(tags.c.id).where(tags.c.store_id == 1).order_by(tags.c.id).limit(1000),
+    # GET /store/<id>/tag
+    "tags in store": select(TagModel).where(TagModel.store_id == 1),
+    # ItemModel.tags / TagModel.items lazy loads and their secondary cleanup
+    "tags of item": select(TagModel).join(items_tags).where(items_tags.c.item_id == 1),
+    "items of tag": select(ItemModel).join(items_tags).where(items_tags.c.tag_id == 1),
+    "unlink item": delete(items_tags).where(items_tags.c.item_id == 1),
+    "unlink tag": delete(items_tags).where(items_tags.c.tag_id == 1),
+    # POST /item/<id>/tag/<id> duplicate check
+    "link lookup": select(items_tags.c.id).where(items_tags.c.item_id == 1, items_tags.c.tag_id == 1),
+}
+INDEXED_TABLES = ("items", "tags", "items_tags")
+
+
+def explain(conn, statement):
+    sql = str(statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        lines = conn.exec_driver_sql(f"EXPLAIN {sql}").scalars().all()
+        pattern = r"Seq Scan on (\w+)"
+    else:
+        lines = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+        pattern = r"^SCAN (\w+)"
+    scanned = {match.group(1) for line in lines for match in [re.search(pattern, line)] if match}
+    return lines, scanned & set(INDEXED_TABLES)
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_hot_query_uses_indexes(app, name):
+    with app.app_context(), db.engine.begin() as conn:
+        plan, scanned = explain(conn, HOT_QUERIES[name])
+
+    assert not scanned, f"{name} scans {sorted(scanned)}:\n" + "\n".join(plan)
@@ -0,0 +1,104 @@
+"""Read routing with two SQLite files standing in for a primary and a replica."""
+import shutil
+import sqlite3
+
+import pytest
+from flask import g
+from flask_migrate import upgrade
+from sqlalchemy import select
+
+from app import create_app
+from db import db
+from models import StoreModel
+
+
+@pytest.fixture
+def databases(tmp_path, monkeypatch):
+    primary, replica = tmp_path / "primary.db", tmp_path / "replica.db"
+    monkeypatch.setenv("DB_REPLICA_URLS", f"sqlite:///{replica}")
+    monkeypatch.setenv("DB_REPLICA_CHECK_SECONDS", "0")
+    app = create_app(f"sqlite:///{primary}")
+    with app.app_context():
+        upgrade()
+        db.engines["replica_0"].dispose()
+    shutil.copy(primary, replica)
+    yield app, primary, replica
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def add_store(path, store_id, name):
+    with sqlite3.connect(path) as connection:
+        connection.execute("INSERT INTO stores (id, name) VALUES (?, ?)", (store_id, name))
+
+
+def test_get_reads_from_replica(databases):
+    app, primary, replica = databases
+    add_store(primary, 1, "on-primary")
+    add_store(replica, 1, "on-replica")
+
+    response = app.test_client().get("/store/1")
+
+    assert response.status_code == 200
+    assert response.get_json()["name"] == "on-replica"
+
+
+def test_writes_and_locking_reads_use_primary(databases):
+    app, primary, replica = databases
+    client = app.test_client()
+
+    assert client.post("/store", json={"name": "new"}).status_code == 201
+    with sqlite3.connect(primary) as connection:
+        assert connection.execute("SELECT name FROM stores").fetchall() == [("new",)]
+    with sqlite3.connect(replica) as connection:
+        assert connection.execute("SELECT name FROM stores").fetchall() == []
+
+    with app.test_request_context("/store/1"):
+        g.db_read_bind = "replica_0"
+        statement = select(StoreModel)
+        assert db.session.get_bind(clause=statement) is db.engines["replica_0"]
+        assert db.session.get_bind(clause=statement.with_for_update()) is db.engine
+
+
+def test_write_cookie_keeps_reads_on_primary(databases):
+    app, primary, replica = databases
+    client = app.test_client()
+    store_id = client.post("/store", json={"name": "mine"}).get_json()["id"]
+    add_store(replica, store_id, "stale")
+
+    assert client.get(f"/store/{store_id}").get_json()["name"] == "mine"
+
+
+def test_replica_miss_retries_on_primary(databases):
+    app, primary, replica = databases
+    store_id = app.test_client().post("/store", json={"name": "fresh"}).get_json()["id"]
+
+    # A cookie-less client, e.g. one that only keeps its Bearer token.
+    response = app.test_client().get(f"/store/{store_id}")
+
+    assert response.status_code == 200
+    assert response.get_json()["name"] == "fresh"
+    assert app.test_client().get("/store/999").status_code == 404
+
+
+def test_lagging_replica_leaves_rotation(databases, monkeypatch):
+    app, primary, replica = databases
+    add_store(primary, 1, "on-primary")
+    add_store(replica, 1, "on-replica")
+    monkeypatch.setattr("replicas.replica_lag", lambda connection, primary_lsn=None: 60.0)
+
+    assert app.test_client().get("/store/1").get_json()["name"] == "on-primary"
+    assert app.extensions["replicas"].replicas[0].error == "lag 60.0s exceeds 5s"
+
+
+def test_unreachable_replica_leaves_rotation(databases):
+    app, primary, replica = databases
+    add_store(primary, 1, "on-primary")
+    with app.app_context():
+        db.engines["replica_0"].dispose()
+    replica.unlink()
+    replica.mkdir()
+
+    assert app.test_client().get("/store/1").get_json()["name"] == "on-primary"
+    assert app.extensions["replicas"].replicas[0].healthy is False
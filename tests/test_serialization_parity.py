@@ -0,0 +1,118 @@
+"""Compiled dumpers must produce the same JSON bytes as marshmallow."""
+from datetime import datetime, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from flask import current_app
+
+from db import db
+from fieldsets import select_schema
+from loading import schema_query
+from models import ItemModel, StoreModel, TagModel
+from schemas import (
+    ItemSchema,
+    PlainItemSchema,
+    PlainStoreSchema,
+    PlainTagSchema,
+    StoreDeletionJobSchema,
+    StoreSchema,
+    TagAndItemSchema,
+    TagSchema,
+)
+from serialization import json_response
+
+
+def edge_cases():
+    store = SimpleNamespace(id=7, name=b"bytes-name", items=[], tags=None)
+    tag = SimpleNamespace(id=3, name=None, store=None, store_id=None)
+    item = SimpleNamespace(
+        id=Decimal("5"), name=42, price=Decimal("19.99"), store_id=7, store=store, tags=[tag]
+    )
+    no_tags = SimpleNamespace(id=6, name="missing tags", price=1e16, store_id=7, store=None)
+    empty_store = SimpleNamespace(id=8, name="empty", items=[], tags=[])
+    job = SimpleNamespace(
+        id="job",
+        store_id=1,
+        status="running",
+        items_total=10,
+        tags_total=0,
+        items_moved=5,
+        tags_moved=0,
+        error=None,
+        created_at=datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        updated_at=datetime(2024, 1, 2, 3, 4, 6, tzinfo=timezone.utc),
+    )
+    return {
+        "item": (ItemSchema, [item, no_tags]),
+        "plain item": (PlainItemSchema, [item, no_tags]),
+        "store": (StoreSchema, [store, empty_store]),
+        "plain store": (PlainStoreSchema, [store]),
+        "tag without store": (TagSchema, [tag]),
+        "plain tag": (PlainTagSchema, [tag]),
+        "deletion job": (StoreDeletionJobSchema, [job]),
+        "tag and item": (TagAndItemSchema, [{"message": "linked", "item": item, "tag": tag}]),
+        "exclude": (StoreSchema(exclude=("items",)), [store, empty_store]),
+        "sparse dotted": (
+            select_schema(ItemSchema, {"fields": "id,name,tags.name"}),
+            [item, no_tags],
+        ),
+        "sparse embed": (
+            select_schema(ItemSchema, {"fields": "id", "embed": "store"}),
+            [item, no_tags],
+        ),
+        "sparse no embeds": (select_schema(StoreSchema, {"embed": ""}), [store, empty_store]),
+        "sparse tag store": (
+            select_schema(TagSchema, {"fields": "name,store.name"}),
+            [tag],
+        ),
+    }
+
+
+def seed():
+    store = StoreModel(name='store é漢 "q"')
+    empty = StoreModel(name="empty")
+    tags = [TagModel(name=f"tag-{i}\n\t", store=store) for i in range(3)]
+    db.session.add_all([store, empty, *tags])
+    for i in range(5):
+        db.session.add(
+            ItemModel(name=f"item-{i} ☃", price=i * 1.1 + 1e-7, store=store, tags=tags[: i % 4])
+        )
+    db.session.commit()
+
+
+def marshmallow_bytes(schema, objs, many):
+    schema = schema() if isinstance(schema, type) else schema
+    return current_app.json.response(schema.dump(objs, many=many)).get_data()
+
+
+def assert_parity(schema, objs):
+    assert json_response(schema, objs, many=True).get_data() == marshmallow_bytes(schema, objs, True)
+    for obj in objs:
+        assert json_response(schema, obj).get_data() == marshmallow_bytes(schema, obj, False)
+
+
+@pytest.mark.parametrize("case", edge_cases())
+def test_edge_case_parity(app, case):
+    with app.app_context():
+        schema, objs = edge_cases()[case]
+        assert_parity(schema, objs)
+
+
+@pytest.mark.parametrize(
+    "model, schema, selection",
+    [
+        (ItemModel, ItemSchema, {}),
+        (StoreModel, StoreSchema, {}),
+        (TagModel, TagSchema, {}),
+        (ItemModel, ItemSchema, {"fields": "id,name,price"}),
+        (ItemModel, ItemSchema, {"fields": "name,store.name,tags.id"}),
+        (StoreModel, StoreSchema, {"embed": "tags"}),
+        (TagModel, TagSchema, {"fields": "id", "embed": "store"}),
+    ],
+)
+def test_orm_row_parity(app, model, schema, selection):
+    with app.test_request_context():
+        seed()
+        schema = select_schema(schema, selection)
+        assert_parity(schema, schema_query(model, schema).all())
@@ -0,0 +1,67 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from db import db
+from models import ItemModel, StoreDeletionJobModel, StoreModel
+from store_deletion import ACTIVE_JOB_STATUSES, UNASSIGNED_STORE_ID
+
+
+def wait_for(app, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while True:
+        with app.app_context():
+            job = db.session.get(StoreDeletionJobModel, job_id)
+            if job.status not in ACTIVE_JOB_STATUSES or time.monotonic() > deadline:
+                return job
+        time.sleep(0.05)
+
+
+def test_delete_resumes_abandoned_job(app, client):
+    with app.app_context():
+        db.session.add(StoreModel(id=UNASSIGNED_STORE_ID, name="Unassigned"))
+        store = StoreModel(name="big-store")
+        db.session.add_all(ItemModel(name=f"item-{n}", price=1.0, store=store) for n in range(5))
+        db.session.commit()
+        abandoned_at = datetime.now(timezone.utc) - timedelta(
+            seconds=app.config["STORE_DELETE_JOB_STALE_SECONDS"] + 60
+        )
+        db.session.add(StoreDeletionJobModel(
+            id="abandoned-job",
+            store_id=store.id,
+            status="running",
+            items_total=5,
+            tags_total=0,
+            created_at=abandoned_at,
+            updated_at=abandoned_at,
+        ))
+        db.session.commit()
+        store_id = store.id
+
+    response = client.delete(f"/store/{store_id}")
+    assert response.status_code == 202
+    assert response.get_json()["job"]["id"] == "abandoned-job"
+    job = wait_for(app, "abandoned-job")
+    assert job.status == "completed"
+    assert job.items_moved == 5
+
+    with app.app_context():
+        assert db.session.get(StoreModel, store_id) is None
+        assert db.session.get(StoreModel, UNASSIGNED_STORE_ID).item_count == 5
+
+
+def test_delete_leaves_live_job_alone(app, client):
+    with app.app_context():
+        store = StoreModel(name="busy-store")
+        db.session.add(store)
+        db.session.commit()
+        db.session.add(StoreDeletionJobModel(
+            id="live-job", store_id=store.id, status="running", items_total=0, tags_total=0,
+        ))
+        db.session.commit()
+        store_id = store.id
+
+    assert client.delete(f"/store/{store_id}").status_code == 202
+
+    with app.app_context():
+        assert db.session.get(StoreDeletionJobModel, "live-job").status == "running"
+        assert db.session.get(StoreModel, store_id) is not None
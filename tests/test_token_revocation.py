@@ -0,0 +1,22 @@
+def login(client):
+    credentials = {"username": "alice", "password": "correct horse"}
+    assert client.post("/register", json=credentials).status_code == 201
+    response = client.post("/login", json=credentials)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_logout_revokes_access_token(client):
+    tokens = login(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    assert client.post("/logout", headers=headers).status_code == 200
+    assert client.post("/logout", headers=headers).status_code == 401
+
+
+def test_refresh_issues_access_token(client):
+    tokens = login(client)
+    response = client.post("/refresh", headers={"Authorization": f"Bearer {tokens['refresh_token']}"})
+
+    assert response.status_code == 200
+    assert response.get_json()["access_token"]
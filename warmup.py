@@ -0,0 +1,159 @@
+"""
+    Startup warm-up.
+
+    Runs once when the app is created, before any traffic, instead of on the
+    first request: it checks that the database is at the Alembic head, opens
+    the pool's connections, configures the mappers and loader options and
+    renders the OpenAPI spec. ``/readyz`` stays at 503 until it has succeeded.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from flask import Response
+from sqlalchemy.orm import configure_mappers
+
+from db import db
+from loading import eager_load_options
+from replicas import check_replicas
+from models import ItemModel, StoreModel, TagModel
+from schemas import ItemSchema, StoreSchema, TagSchema
+
+
+SCHEMA_CHECK_MODES = ("strict", "warn", "off")
+
+logger = logging.getLogger("app.warmup")
+
+
+class WarmupError(Exception):
+    """Raised when a warm-up step finds the service unfit to take traffic."""
+
+
+class WarmupState:
+    def __init__(self):
+        self.ready = False
+        self.error = None
+        self.lock = threading.Lock()
+
+
+def _check_migration_head(app):
+    mode = app.config["WARMUP_SCHEMA_CHECK"]
+    if mode == "off":
+        return
+
+    script = ScriptDirectory(app.extensions["migrate"].directory)
+    expected = set(script.get_heads())
+    with db.engine.connect() as connection:
+        current = set(MigrationContext.configure(connection).get_current_heads())
+    if current == expected:
+        return
+
+    message = (
+        f"database is at revision {sorted(current) or 'none'}, "
+        f"expected {sorted(expected)}; run `flask db upgrade`"
+    )
+    if mode == "strict":
+        raise WarmupError(message)
+    logger.warning(message, extra={"event": "warmup_schema_mismatch"})
+
+
+def open_pool_connections(app):
+    """Check out and return ``WARMUP_POOL_CONNECTIONS`` connections."""
+    connections = []
+    try:
+        for _ in range(app.config["WARMUP_POOL_CONNECTIONS"]):
+            connections.append(db.engine.connect())
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+def _prime_serialization(app):
+    configure_mappers()
+    for model, schema in (
+        (ItemModel, ItemSchema),
+        (StoreModel, StoreSchema),
+        (TagModel, TagSchema),
+    ):
+        eager_load_options(model, schema)
+
+
+def _render_openapi_spec(app):
+    # flask-smorest rebuilds the spec on every request; serve the bytes
+    # rendered once at startup instead.
+    api = app.extensions["flask-smorest"]["apis"][""]["ext_obj"]
+    spec = json.dumps(api.spec.to_dict(), indent=2, sort_keys=False)
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint.endswith(".openapi_json"):
+            app.view_functions[rule.endpoint] = lambda: Response(
+                spec, mimetype="application/json"
+            )
+
+
+WARMUP_STEPS = (
+    ("migration_head", _check_migration_head),
+    ("pool", open_pool_connections),
+    ("replicas", check_replicas),
+    ("serialization", _prime_serialization),
+    ("openapi", _render_openapi_spec),
+)
+
+
+def init_warmup(app):
+    app.config.setdefault("WARMUP_SCHEMA_CHECK", os.getenv("WARMUP_SCHEMA_CHECK", "strict").lower())
+    if app.config["WARMUP_SCHEMA_CHECK"] not in SCHEMA_CHECK_MODES:
+        raise ValueError(f"WARMUP_SCHEMA_CHECK must be one of {', '.join(SCHEMA_CHECK_MODES)}")
+    app.config.setdefault(
+        "WARMUP_POOL_CONNECTIONS",
+        int(os.getenv("WARMUP_POOL_CONNECTIONS", app.config.get("DB_POOL_SIZE", 1))),
+    )
+    app.extensions["warmup"] = WarmupState()
+
+
+def warm_up(app, steps=None, blocking=True):
+    """Run the warm-up steps (all of them by default) and record readiness.
+
+    Returns whether the app is ready. With ``blocking=False`` a call that
+    finds another warm-up in progress returns immediately.
+    """
+    state = app.extensions["warmup"]
+    if not state.lock.acquire(blocking=blocking):
+        return state.ready
+    try:
+        with app.app_context():
+            for name, step in WARMUP_STEPS:
+                if steps is not None and name not in steps:
+                    continue
+                started = time.perf_counter()
+                step(app)
+                logger.info(
+                    "Warm-up step finished",
+                    extra={
+                        "event": "warmup_step",
+                        "step": name,
+                        "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                    },
+                )
+    except WarmupError as error:
+        state.ready = False
+        state.error = str(error)
+        logger.warning("Warm-up failed: %s", error, extra={"event": "warmup_failed"})
+    except Exception as error:
+        state.ready = False
+        state.error = str(error)
+        logger.exception("Warm-up failed", extra={"event": "warmup_failed"})
+    else:
+        if steps is None:
+            state.ready = True
+            state.error = None
+    finally:
+        state.lock.release()
+    return state.ready
+
+
+def warmup_state(app):
+    return app.extensions["warmup"]